@@ -1,18 +1,24 @@
 import os
 from tempfile import TemporaryDirectory
 
+import joblib
 import pytest
 import numpy as np
 import xarray as xr
 from numpy.testing import assert_allclose
 
-from xyzpy import combo_runner, combo_runner_to_ds, Runner, Harvester
+from xyzpy import combo_runner, combo_runner_to_ds, Runner, Harvester, load_ds
 from xyzpy.gen.batch import (
     XYZError,
     Crop,
     parse_crop_details,
     grow,
     load_crops,
+    PRGS_NM,
+    BTCH_NM,
+    RSLT_NM,
+    _load_batch,
+    _prefetch_map,
 )
 
 from . import (
@@ -128,6 +134,134 @@ class TestSowerReaper:
 
         assert results == expected
 
+    @pytest.mark.parametrize('batchsize', [1, 5])
+    def test_packed(self, batchsize):
+        combos = [('a', [10, 20, 30]),
+                  ('b', [4, 5, 6, 7])]
+        expected = combo_runner(foo_add, combos, constants={'c': True})
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, batchsize=batchsize,
+                        packed=True)
+            crop.sow_combos(combos, constants={'c': True})
+            assert sorted(os.listdir(os.path.join(crop.location,
+                                                  'batches'))) == [
+                'xyz-batches.idx', 'xyz-batches.pack']
+            assert crop.num_sown_batches == crop.num_batches
+
+            for i in reversed(range(1, crop.num_batches + 1)):
+                grow(i, Crop(parent_dir=tdir, name='foo_add'))
+
+            assert not crop.check_bad(thorough=True)
+            assert crop.reap() == expected
+
+    def test_compact_batches(self):
+        combos = [('a', [10, 20, 30]),
+                  ('b', [4, 5, 6, 7])]
+        expected = combo_runner(foo_add, combos, constants={'c': True})
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, batchsize=5)
+            crop.sow_combos(combos, constants={'c': True})
+
+            batch_file = os.path.join(crop.location, 'batches',
+                                      BTCH_NM.format(2))
+            assert joblib.load(batch_file) == {'_xyz_format': 'range',
+                                               'start': 5, 'stop': 10}
+            assert _load_batch(crop.location, 2)[0] == {'a': 20, 'b': 5,
+                                                        'c': True}
+
+            # batches sown in the old format can still be grown
+            joblib.dump(_load_batch(crop.location, 3), os.path.join(
+                crop.location, 'batches', BTCH_NM.format(3)))
+            for i in range(1, 4):
+                grow(i, crop)
+            assert crop.reap() == expected
+
+    def test_compact_cases(self):
+        fn_args = ('a', 'b', 'c')
+        cases = [(1, 'x', np.float32(0.5)),
+                 (2, 'y', np.float32(1.5)),
+                 (3, 'z', np.float32(2.5))]
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, batchsize=2)
+            crop.sow_cases(fn_args, cases)
+            kws = _load_batch(crop.location, 1) + _load_batch(crop.location, 2)
+
+        assert [tuple(kw[k] for k in fn_args) for kw in kws] == cases
+        assert type(kws[0]['a']) is int
+        assert type(kws[0]['c']) is np.float32
+
+    def test_compact_ragged_dict_cases(self):
+        def fn(a, c, b=0):
+            return a + b + c
+
+        cases = [{'a': 1}, {'a': 2, 'b': 3}]
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=fn, parent_dir=tdir, batchsize=2)
+            crop.sow_cases(None, cases, constants={'c': 100})
+            assert _load_batch(crop.location, 1) == [{'a': 1, 'c': 100},
+                                                     {'a': 2, 'b': 3,
+                                                      'c': 100}]
+            grow(1, crop)
+            assert joblib.load(os.path.join(
+                crop.location, 'results', RSLT_NM.format(1))) == (101, 105)
+
+    def test_progress_index(self):
+        combos = [('a', [10, 20, 30]),
+                  ('b', [4, 5, 6, 7])]
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, batchsize=5)
+            crop.sow_combos(combos, constants={'c': True})
+            grow(2, crop)
+
+            index_file = os.path.join(crop.location, PRGS_NM)
+            assert os.path.getsize(index_file) == 3
+            assert crop.num_sown_batches == 3
+            assert crop.num_results == 1
+            assert crop.missing_results() == (1, 3)
+
+            # cached progress is reused until it expires
+            crop.progress_ttl = 60
+            crop.calc_progress()
+            grow(1, Crop(parent_dir=tdir, name='foo_add'))
+            assert crop.missing_results() == (1, 3)
+            crop.progress_ttl = 0.0
+            assert crop.missing_results() == (3,)
+
+            # falls back to checking the files themselves
+            os.remove(index_file)
+            assert crop.num_sown_batches == 3
+            assert crop.num_results == 2
+            assert crop.missing_results() == (3,)
+
+    @pytest.mark.parametrize('thorough', [False, True])
+    def test_check_bad(self, thorough):
+        combos = [('a', [10, 20, 30]),
+                  ('b', [4, 5, 6, 7])]
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(fn=foo_add, parent_dir=tdir, batchsize=5)
+            crop.sow_combos(combos, constants={'c': True})
+            for i in range(1, 4):
+                grow(i, crop)
+
+            # results are moved into place, so no temporary files left
+            assert len(os.listdir(os.path.join(crop.location, 'results'))) == 3
+            assert not crop.check_bad(thorough=thorough)
+
+            # truncate a result, as if written by an interrupted process
+            result_file = os.path.join(crop.location, 'results',
+                                       'xyz-result-2.jbdmp')
+            with open(result_file, 'rb+') as f:
+                f.truncate(os.path.getsize(result_file) // 2)
+
+            assert crop.check_bad(thorough=thorough) == ('2',)
+            assert crop.missing_results() == (2,)
+
     def test_field_name_and_overlapping(self):
         combos1 = [('a', [10, 20, 30]),
                    ('b', [4, 5, 6, 7])]
@@ -197,6 +331,40 @@ class TestSowerReaper:
 
         assert ds.sel(a=2, b=30, c=400)['bananas'].data == 432
 
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_reap_threaded(self, stream):
+        pytest.importorskip('zarr')
+        combos = (('a', [1, 2]),
+                  ('b', [10, 20, 30]),
+                  ('c', [100, 200, 300, 400]))
+        runner = Runner(foo3_scalar, var_names=['bananas'])
+
+        with TemporaryDirectory() as tdir:
+            crop = Crop(farmer=runner, parent_dir=tdir, batchsize=5)
+            crop.sow_combos(combos)
+            crop.grow_missing()
+
+            store = os.path.join(tdir, 'reaped.zarr') if stream else None
+            ds = crop.reap(num_threads=3, stream_to=store).load()
+
+        expected = runner.run_combos(combos)
+        assert ds.identical(expected.astype(ds['bananas'].dtype))
+
+    def test_prefetch_map_is_bounded(self):
+        loaded = []
+
+        def load(x):
+            loaded.append(x)
+            return x
+
+        it = _prefetch_map(load, range(100), num_threads=2, window=4)
+        assert next(it) == 0
+        assert next(it) == 1
+        assert len(loaded) <= 6
+        it.close()
+        assert list(_prefetch_map(load, range(10), num_threads=3)) == list(
+            range(10))
+
     @pytest.mark.parametrize("num_batches", [67, 98])
     def test_num_batches_doesnt_divide(self, num_batches):
         combos = (('a', [1, 2, 3]),
@@ -289,6 +457,63 @@ class TestSowerReaper:
                                         allow_incomplete=True)
             assert ds.identical(ds_exp)
 
+    @pytest.mark.parametrize('use_harvester', [False, True])
+    def test_reap_incremental(self, use_harvester):
+        combos = dict(a=[1, 2, 3], b=[10, 20, 30, 40])
+        runner = Runner(foo_add, var_names='sum', constants={'c': True})
+
+        with TemporaryDirectory() as tdir:
+            if use_harvester:
+                farmer = Harvester(runner, os.path.join(tdir, 'test.h5'))
+            else:
+                farmer = runner
+            crop = farmer.Crop(name='fn', batchsize=3, parent_dir=tdir)
+            crop.sow_combos(combos)
+            grow(1, crop)
+            grow(3, crop)
+
+            ds = crop.reap_incremental()
+            assert ds['sum'].notnull().sum() == 6
+            assert crop.num_results == 2
+            assert crop.missing_results() == (2, 4)
+
+            # nothing new to reap
+            assert crop.reap_incremental() is None
+
+            crop.grow_missing()
+            ds = crop.reap_incremental(clean_up=True)
+            assert ds['sum'].notnull().sum() == 6
+            assert not os.path.exists(crop.location)
+
+        full_ds = farmer.full_ds if use_harvester else runner.last_ds
+        assert full_ds['sum'].sel(a=3, b=40) == 43
+        assert full_ds['sum'].notnull().all()
+
+    def test_reap_incremental_no_sync(self):
+        combos = dict(a=[1, 2, 3], b=[10, 20, 30, 40])
+        runner = Runner(foo_add, var_names='sum', constants={'c': True})
+
+        with TemporaryDirectory() as tdir:
+            data_name = os.path.join(tdir, 'test.h5')
+            h = Harvester(runner, data_name)
+            crop = h.Crop(name='fn', batchsize=3, parent_dir=tdir)
+            crop.sow_combos(combos)
+            grow(1, crop)
+
+            # only merged in memory, so only recorded on this crop
+            ds = crop.reap_incremental(sync=False)
+            assert ds['sum'].notnull().sum() == 3
+            assert crop.reap_incremental(sync=False) is None
+            assert not os.path.exists(data_name)
+
+            # e.g. a new process, the results are still to be merged
+            h = Harvester(runner, data_name)
+            crop = h.Crop(name='fn', batchsize=3, parent_dir=tdir)
+            ds = crop.reap_incremental()
+            assert ds['sum'].notnull().sum() == 3
+            assert crop.reap_incremental() is None
+            assert load_ds(data_name)['sum'].notnull().sum() == 3
+
     def test_new_ds_crop_loads_info_incomplete(self):
         def fn(a, b):
             return xr.Dataset({'sum': a + b, 'diff': a - b})
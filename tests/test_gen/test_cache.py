@@ -0,0 +1,153 @@
+import functools
+import os
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+import xyzpy as xyz
+from xyzpy.gen.cache import fn_fingerprint
+
+from . import foo3_scalar
+
+
+def add(a, b):
+    return a + b
+
+
+def sub(a, b):
+    return a - b
+
+
+class CallableAdd:
+
+    def __init__(self, offset):
+        self.offset = offset
+
+    def __call__(self, a, b):
+        return a + b + self.offset
+
+
+class TestFnFingerprint:
+
+    def test_stable(self):
+        assert fn_fingerprint(add) == fn_fingerprint(add)
+        assert fn_fingerprint(add) != fn_fingerprint(sub)
+
+    def test_partial(self):
+        assert (fn_fingerprint(functools.partial(add, b=1)) !=
+                fn_fingerprint(functools.partial(add, b=2)))
+
+    def test_closure(self):
+
+        def make(c):
+            def fn(a):
+                return a + c
+            return fn
+
+        assert fn_fingerprint(make(1)) == fn_fingerprint(make(1))
+        assert fn_fingerprint(make(1)) != fn_fingerprint(make(2))
+
+    def test_closure_mutable(self):
+        evaluated = []
+
+        def fn(a):
+            evaluated.append(a)
+            return a
+
+        key = fn_fingerprint(fn)
+        fn(1)
+        assert fn_fingerprint(fn) == key
+
+    def test_callable_object(self):
+        assert (fn_fingerprint(CallableAdd(1)) ==
+                fn_fingerprint(CallableAdd(1)))
+        assert (fn_fingerprint(CallableAdd(1)) !=
+                fn_fingerprint(CallableAdd(2)))
+
+    def test_callable_object_cycle(self):
+
+        class Stepper(CallableAdd):
+
+            def __init__(self, offset):
+                super().__init__(offset)
+                self.step = self.update
+
+            def update(self):
+                self.offset += 1
+
+        assert fn_fingerprint(Stepper(1)) == fn_fingerprint(Stepper(1))
+        assert fn_fingerprint(Stepper(1)) != fn_fingerprint(Stepper(2))
+
+
+class TestResultCache:
+
+    def test_memory_lru(self):
+        cache = xyz.ResultCache(memory_size=2)
+        cache['a'] = 1
+        cache['b'] = 2
+        assert cache['a'] == 1
+        cache['c'] = 3
+        assert 'a' in cache
+        assert 'b' not in cache
+        with pytest.raises(KeyError):
+            cache['b']
+
+    def test_disk_eviction(self, tmpdir):
+        cache = xyz.ResultCache(str(tmpdir), memory_size=0, disk_size=30000)
+        for i in range(10):
+            cache[str(i)] = np.arange(1000)
+        total = sum(os.path.getsize(os.path.join(str(tmpdir), f))
+                    for f in os.listdir(str(tmpdir)))
+        assert total <= 30000
+        assert 0 < len(cache) < 10
+        assert_allclose(cache['9'], np.arange(1000))
+
+        # persists between instances
+        new_cache = xyz.ResultCache(str(tmpdir))
+        assert_allclose(new_cache['9'], np.arange(1000))
+
+        new_cache.clear()
+        assert len(new_cache) == 0
+
+    @pytest.mark.parametrize('parallel', [False, True])
+    def test_combo_runner(self, tmpdir, parallel):
+        evaluated = []
+
+        def fn(a, b, c):
+            evaluated.append((a, b, c))
+            return foo3_scalar(a, b, c)
+
+        cache = xyz.ResultCache(str(tmpdir))
+        combos = {'a': [1, 2], 'b': [10, 20]}
+        x = xyz.combo_runner(fn, combos, constants={'c': 100}, cache=cache,
+                             parallel=parallel)
+        assert_allclose(x, [[111, 121], [112, 122]])
+        assert len(cache) == 4
+
+        # a new value, and changed constants
+        evaluated.clear()
+        combos = {'a': [1, 2, 3], 'b': [10, 20]}
+        x = xyz.combo_runner(fn, combos, constants={'c': 100}, cache=cache)
+        assert_allclose(x, [[111, 121], [112, 122], [113, 123]])
+        assert sorted(evaluated) == [(3, 10, 100), (3, 20, 100)]
+        x = xyz.combo_runner(fn, combos, constants={'c': 200}, cache=cache)
+        assert len(evaluated) == 8
+
+    def test_runner(self):
+        evaluated = []
+
+        def fn(a, b):
+            evaluated.append((a, b))
+            return a + b, a - b
+
+        r = xyz.Runner(fn, var_names=['sum', 'diff'],
+                       cache=xyz.ResultCache())
+        r.run_combos({'a': [1, 2], 'b': [3, 4]})
+        ds = r.run_combos({'a': [1, 2, 3], 'b': [3, 4]})
+        assert len(evaluated) == 6
+        assert ds['sum'].sel(a=2, b=4) == 6
+        r.run_cases([(1, 3), (5, 6)])
+        ds = r.run_cases([(1, 3), (5, 6)])
+        assert len(evaluated) == 8
+        assert ds['diff'].sel(a=5, b=6) == -1
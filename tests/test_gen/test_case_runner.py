@@ -54,6 +54,14 @@ class TestCaseRunner:
         xs = case_runner(foo3_scalar, ('a', 'b', 'c'), cases, num_workers=1)
         assert xs == (111, 222, 333)
 
+    def test_parallel_preload_fn(self):
+        cases = ((1, 10, 100),
+                 (2, 20, 200),
+                 (3, 30, 300))
+        xs = case_runner(foo3_scalar, ('a', 'b', 'c'), cases, num_workers=2,
+                         preload_fn=True)
+        assert xs == (111, 222, 333)
+
     def test_split(self):
         cases = ((1, 10, 100),
                  (2, 20, 200),
@@ -62,6 +70,40 @@ class TestCaseRunner:
         assert a == (111, 222, 333)
         assert b == (False, True, False)
 
+    @pytest.mark.parametrize('cost', ['callable', 'dataarray'])
+    def test_cost(self, cost):
+        evaluated = []
+
+        def fn(a, b, c):
+            evaluated.append(a)
+            return foo3_scalar(a, b, c)
+
+        if cost == 'callable':
+            cost, expected_order = (lambda a, b, c: a % 3), [2, 1, 3]
+        else:
+            cost = xr.DataArray([2, 1], dims=['a'], coords={'a': [1, 2]})
+            expected_order = [1, 3, 2]
+
+        cases = ((1, 10, 100),
+                 (2, 20, 200),
+                 (3, 30, 300))
+        xs = case_runner(fn, ('a', 'b', 'c'), cases, cost=cost)
+        assert xs == (111, 222, 333)
+        assert evaluated == expected_order
+
+    def test_async(self):
+        import asyncio
+
+        async def afoo(a, b, c):
+            await asyncio.sleep(0.01)
+            return foo3_scalar(a, b, c)
+
+        cases = ((1, 10, 100),
+                 (2, 20, 200),
+                 (3, 30, 300))
+        xs = case_runner(afoo, ('a', 'b', 'c'), cases)
+        assert xs == (111, 222, 333)
+
     def test_single_args(self):
         cases = (1, 2, 3)
         xs = case_runner(foo3_scalar, 'a', cases,
@@ -172,6 +214,58 @@ class TestCasesToDS:
                      overwrite=False)
         assert ds['x'].sel(a=2, b=20).data == 22
 
+    def test_add_to_ds_transposed(self):
+        ds = xr.Dataset(coords={'a': [1, 2, 3],
+                                'b': [10, 20],
+                                't': [0.1, 0.2]})
+        ds['x'] = (('t', 'b', 'a'), np.full((2, 2, 3), np.nan))
+        _cases_to_ds(results=[[1.1, 1.2], [3.1, 3.2]],
+                     fn_args=['a', 'b'],
+                     cases=[[1, 20], [3, 10]],
+                     var_names=['x'],
+                     var_dims=['t'],
+                     add_to_ds=ds)
+        assert_allclose(ds['x'].sel(a=1, b=20).data, [1.1, 1.2])
+        assert_allclose(ds['x'].sel(a=3, b=10).data, [3.1, 3.2])
+        assert ds['x'].sel(a=2).isnull().all()
+
+        # second write conflicts with first
+        with pytest.raises(ValueError):
+            _cases_to_ds(results=[[0.0, 0.0], [0.0, 0.0]],
+                         fn_args=['a', 'b'],
+                         cases=[[2, 20], [3, 10]],
+                         var_names=['x'],
+                         var_dims=['t'],
+                         add_to_ds=ds)
+        # and nothing was written
+        assert ds['x'].sel(a=2).isnull().all()
+
+    def test_many_cases(self):
+        cases = [(a, b) for a in range(30) for b in range(40)][::-1]
+        results = [(a * b, a % 2 == 0) for a, b in cases]
+        ds = _cases_to_ds(results=results,
+                          fn_args=('a', 'b'),
+                          cases=cases,
+                          var_names=('x', 'y'),
+                          var_dims={'x': (), 'y': ()},
+                          var_coords={})
+        assert_allclose(ds['x'].values, np.outer(range(30), range(40)))
+        assert bool(ds['y'].sel(a=4, b=3))
+        assert not bool(ds['y'].sel(a=5, b=3))
+
+    def test_scalar_broadcast_over_internal_dim(self):
+        cases = [(1,), (2,), (3,)]
+        ds = _cases_to_ds(results=[10 * a for a, in cases],
+                          fn_args=['a'],
+                          cases=cases,
+                          var_names=['x'],
+                          var_dims={'x': ['t']},
+                          var_coords={'t': [0, 1, 2]})
+        assert ds['x'].dims == ('a', 't')
+        assert_allclose(ds['x'].values, [[10, 10, 10],
+                                         [20, 20, 20],
+                                         [30, 30, 30]])
+
 
 class TestCaseRunnerToDS:
     def test_single(self):
@@ -288,6 +382,23 @@ class TestCaseRunnerToDS:
         assert np.logical_not(np.isnan(fds['x'].data)).all()
         assert np.logical_not(np.isnan(fds['y'].data)).all()
 
+    def test_profile(self):
+        cases = ((1, 10, 100),
+                 (2, 20, 200))
+        ds = case_runner_to_ds(foo3_float_bool, ('a', 'b', 'c'), cases,
+                               var_names=['x', 'y'], profile=True)
+        assert ds['x'].sel(a=2, b=20, c=200) == 222
+        assert ds['_xyz_time'].notnull().sum() == 2
+
+    def test_repeats(self):
+        cases = ((1, 10, 100),
+                 (2, 20, 200))
+        ds = case_runner_to_ds(foo3_float_bool, ('a', 'b', 'c'), cases,
+                               var_names=['x', 'y'], repeats=10)
+        assert ds['x'].sel(a=2, b=20, c=200) == 222
+        assert ds['x_err'].sel(a=2, b=20, c=200) == 0.0
+        assert ds['_xyz_repeats'].sel(a=1, b=10, c=100) == 5
+
 
 # --------------------------------------------------------------------------- #
 # Finding and filling missing data                                            #
@@ -348,6 +459,20 @@ class TestFindMissingCases:
         assert all(t_config in m_configs for t_config in t_configs)
         assert all(m_config in t_configs for m_config in m_configs)
 
+    def test_dask_and_broadcast(self):
+        pytest.importorskip('dask')
+        ds = xr.Dataset(coords={'a': [1, 2, 3], 'b': [40, 50],
+                                't': [0.1, 0.2]})
+        ds['x'] = (('b', 'a'), np.array([[0.1, np.nan, np.nan],
+                                         [np.nan, 0.2, np.nan]]))
+        # only depends on 'a' -> data here means no missing cases for a=3
+        ds['y'] = (('t', 'a'), np.array([[np.nan, np.nan, 1.0],
+                                         [np.nan, np.nan, np.nan]]))
+        ds = ds.chunk({'a': 2})
+        m_args, m_cases = find_missing_cases(ds, ignore_dims='t')
+        assert m_args == ('a', 'b')
+        assert m_cases == ((1, 50), (2, 40))
+
 
 class TestFillMissingCases:
     def test_simple(self):
@@ -9,6 +9,7 @@ from xyzpy.gen.combo_runner import (
     combo_runner,
     _combos_to_ds,
     combo_runner_to_ds,
+    collect_arrays,
 )
 from . import (
     foo3_scalar,
@@ -34,6 +35,10 @@ _test_expect1 = (np.array([1, 2]).reshape((2, 1, 1)) +
                  np.array([100, 200, 300, 400]).reshape((1, 1, 4)))
 
 
+def noisy_mean(mu, sigma):
+    return mu + sigma * np.random.randn(), mu + sigma * np.random.randn(3)
+
+
 class TestComboRunner:
     def test_simple(self):
         x = combo_runner(foo3_scalar, _test_combos1)
@@ -102,6 +107,98 @@ class TestComboRunner:
                            parallel=parallel, verbosity=2)]
         assert_allclose(x, _test_expect1)
 
+    @pytest.mark.parametrize('chunksize', [1, 5, 24, 100, 'auto'])
+    def test_parallel_chunksize(self, chunksize):
+        x = combo_runner(foo3_float_bool, _test_combos1, num_workers=2,
+                         split=True, chunksize=chunksize)
+        assert_allclose(x[0], _test_expect1)
+        assert np.all(np.asarray(x[1])[1, ...])
+        assert x == combo_runner(foo3_float_bool, _test_combos1, split=True)
+
+    @pytest.mark.parametrize('executor', ['cf-thread', 'mp-thread'])
+    def test_executor_chunksize(self, executor):
+        import concurrent.futures as cf
+        import multiprocessing as mp
+        executor = {
+            'cf-thread': cf.ThreadPoolExecutor,
+            'mp-thread': mp.pool.ThreadPool,
+        }[executor](2)
+        x = combo_runner(foo3_scalar, _test_combos1, executor=executor,
+                         chunksize=7)
+        assert_allclose(x, _test_expect1)
+
+    @pytest.mark.parametrize('num_workers', [None, 3])
+    def test_asyncio(self, num_workers):
+        import asyncio
+
+        in_flight = [0, 0]
+
+        async def afoo(a, b, c):
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+            await asyncio.sleep(0.01)
+            in_flight[0] -= 1
+            return foo3_scalar(a, b, c)
+
+        x = combo_runner(afoo, _test_combos1, num_workers=num_workers)
+        assert_allclose(x, _test_expect1)
+        assert in_flight[1] == (num_workers or 24)
+
+    def test_asyncio_executor_sync_fn(self):
+        x = combo_runner(foo3_scalar, _test_combos1, executor='asyncio')
+        assert_allclose(x, _test_expect1)
+
+    @pytest.mark.parametrize('chunksize', [None, 4])
+    def test_preload_fn(self, chunksize):
+        heavy = np.random.rand(100, 100)
+
+        def fn(a, b, c):
+            return foo3_scalar(a, b, c) + 0 * heavy.sum()
+
+        x = combo_runner(fn, _test_combos1, num_workers=2, preload_fn=True,
+                         chunksize=chunksize)
+        assert_allclose(x, _test_expect1)
+
+    def test_cost_callable(self):
+        evaluated = []
+
+        def fn(a, b, c):
+            evaluated.append((a, b, c))
+            return foo3_scalar(a, b, c)
+
+        x = combo_runner(fn, _test_combos1, cost=lambda a, b, c: b)
+        assert_allclose(x, _test_expect1)
+        assert [b for _, b, _ in evaluated] == [30] * 8 + [20] * 8 + [10] * 8
+        # ties are kept in the usual order
+        assert evaluated[:3] == [(1, 30, 100), (1, 30, 200), (1, 30, 300)]
+
+    @pytest.mark.parametrize('parallel', [False, True])
+    def test_cost_dataarray(self, parallel):
+        evaluated = []
+
+        def fn(a, b, c):
+            evaluated.append((a, b, c))
+            return foo3_scalar(a, b, c)
+
+        # previous timings only cover some of the combos
+        timings = xr.DataArray([[1.0, 2.0], [4.0, 3.0]], dims=['c', 'a'],
+                               coords={'c': [100, 200], 'a': [1, 2]})
+
+        x = combo_runner(fn, _test_combos1, cost=timings, parallel=parallel,
+                         num_workers=2 if parallel else None)
+        assert_allclose(x, _test_expect1)
+        if not parallel:
+            # unknown costs are assumed to be the largest
+            assert {(a, c) for a, _, c in evaluated[:15]} == {
+                (1, 200), (1, 300), (1, 400), (2, 300), (2, 400)}
+            assert evaluated[-3:] == [(1, 10, 100), (1, 20, 100),
+                                      (1, 30, 100)]
+
+    def test_bad_chunksize(self):
+        with pytest.raises(ValueError):
+            combo_runner(foo3_scalar, _test_combos1, parallel=True,
+                         chunksize=0)
+
 
 class TestCombosToDS:
     def test_simple(self):
@@ -121,12 +218,43 @@ class TestCombosToDS:
         pass
 
 
+class TestCollectArrays:
+    def test_single_var(self):
+        results = [(i, [i, 2 * i]) for i in range(6)]
+        x = collect_arrays(reversed(results), (2, 3))
+        assert x.shape == (2, 3, 2)
+        assert x.dtype == int
+        assert_allclose(x[1, 2], [5, 10])
+
+    def test_multi_var_upcast(self):
+        results = [(0, (1, True, 'a')),
+                   (1, (2.5, False, 'bcd')),
+                   (2, (3, np.nan, 'ef'))]
+        x, y, z = collect_arrays(results, (3,), num_vars=3)
+        assert x.dtype == float
+        assert_allclose(x, [1, 2.5, 3])
+        assert y.dtype == float
+        assert_allclose(y, [1, 0, np.nan])
+        assert z.tolist() == ['a', 'bcd', 'ef']
+
+
 class TestComboRunnerToDS:
     def test_basic(self):
         combos = _test_combos1
         ds = combo_runner_to_ds(foo3_scalar, combos, var_names=['bananas'])
         assert ds.sel(a=2, b=30, c=400)['bananas'].data == 432
 
+    @pytest.mark.parametrize('parallel', [False, True])
+    def test_mixed_dtypes(self, parallel):
+
+        def fn(a, b):
+            return a * b if a > 1 else a + b
+
+        ds = combo_runner_to_ds(fn, {'a': [1, 2], 'b': [0.5, 1.5]},
+                                var_names='x', parallel=parallel)
+        assert ds['x'].dtype == float
+        assert_allclose(ds['x'].values, [[1.5, 2.5], [1.0, 3.0]])
+
     def test_multiresult(self):
         ds = combo_runner_to_ds(foo3_float_bool, _test_combos1,
                                 var_names=['bananas', 'cakes'])
@@ -224,6 +352,173 @@ class TestComboRunnerToDS:
         assert 't' in ds.dims
         assert 't' not in ds.attrs
 
+    @pytest.mark.parametrize('parallel', [False, True])
+    def test_profile(self, parallel):
+        ds = combo_runner_to_ds(foo3_float_bool, _test_combos1,
+                                var_names=['bananas', 'cakes'], profile=True,
+                                parallel=parallel)
+        assert ds.sel(a=2, b=30, c=400)['bananas'].data == 432
+        assert ds['_xyz_time'].dims == ('a', 'b', 'c')
+        assert (ds['_xyz_time'] >= 0).all()
+        assert (ds['_xyz_cpu_time'] >= 0).all()
+        assert (ds['_xyz_peak_rss'] > 0).all()
+        assert ds['_xyz_pid'].dtype == int
+
+        # can then be used to estimate costs
+        x = combo_runner(foo3_scalar, _test_combos1, cost=ds['_xyz_time'])
+        assert_allclose(x, _test_expect1)
+
+    def test_profile_peak_rss_per_point(self):
+        from xyzpy.gen.combo_runner import _reset_peak_rss
+        if not _reset_peak_rss():
+            pytest.skip("Can only reset the peak memory on linux.")
+
+        def fn(n):
+            return np.ones(n * 2**20).sum()
+
+        ds = combo_runner_to_ds(fn, {'n': [50, 1, 1]}, var_names='x',
+                                profile=True)
+        rss = ds['_xyz_peak_rss'].values
+        # the ~400MB of the first point isn't included in the others
+        assert rss[0] > rss[1] + 200 * 2**20
+        assert rss[0] > rss[2] + 200 * 2**20
+
+    def test_profile_needs_var_names(self):
+        with pytest.raises(ValueError):
+            combo_runner_to_ds(foo3_scalar, _test_combos1, var_names=None,
+                               profile=True)
+
+    @pytest.mark.parametrize('parallel', [False, True])
+    def test_repeats(self, parallel):
+        ds = combo_runner_to_ds(noisy_mean, {'mu': [1.0, 2.0],
+                                             'sigma': [0.0, 0.5]},
+                                var_names=['x', 'y'], var_dims={'y': ['i']},
+                                var_coords={'i': [0, 1, 2]}, repeats=1000,
+                                rtol=0.01, atol=0.0, parallel=parallel)
+        assert ds['x_err'].dims == ('mu', 'sigma')
+        assert ds['y_err'].dims == ('mu', 'sigma', 'i')
+        assert_allclose(ds['x'], ds['mu'].broadcast_like(ds['x']), rtol=0.1)
+        assert_allclose(ds['y'], ds['mu'].broadcast_like(ds['y']), rtol=0.1)
+
+        # noiseless points stop after the minimum number of repeats
+        assert (ds['_xyz_repeats'].sel(sigma=0.0) == 5).all()
+        assert (ds['x_err'].sel(sigma=0.0) == 0.0).all()
+        noisy = ds.sel(sigma=0.5)
+        assert (noisy['_xyz_repeats'] > 5).all()
+        assert (noisy['_xyz_repeats'] <= 1000).all()
+        assert (noisy['x_err'] > 0.0).all()
+
+    def test_repeats_spread_over_workers(self):
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+
+        threads = set()
+
+        def fn(sigma):
+            threads.add(threading.get_ident())
+            return 1.0 + sigma * np.random.randn()
+
+        with ThreadPoolExecutor(4) as executor:
+            ds = combo_runner_to_ds(fn, {'sigma': [1.0]}, var_names='x',
+                                    repeats=200, rtol=0.0, atol=0.0,
+                                    min_repeats=10, executor=executor)
+        assert ds['_xyz_repeats'].item() == 200
+        # the single point's repeats were not all run by one worker
+        assert len(threads) > 1
+
+    def test_repeats_min_and_profile(self):
+        ds = combo_runner_to_ds(noisy_mean, {'mu': [1.0], 'sigma': [0.0]},
+                                var_names=['x', 'y'], var_dims={'y': ['i']},
+                                var_coords={'i': [0, 1, 2]}, repeats=100,
+                                min_repeats=20, profile=True)
+        assert (ds['_xyz_repeats'] == 20).all()
+        assert (ds['x'] == 1.0).all()
+        assert (ds['_xyz_time'] > 0.0).all()
+        assert (ds['_xyz_peak_rss'] > 0).all()
+
+    def test_repeats_max(self):
+        ds = combo_runner_to_ds(noisy_mean, {'mu': [0.0], 'sigma': [1.0]},
+                                var_names=['x', 'y'], var_dims={'y': ['i']},
+                                var_coords={'i': [0, 1, 2]}, repeats=3,
+                                rtol=0.0, atol=0.0)
+        assert (ds['_xyz_repeats'] == 3).all()
+
+    @pytest.mark.parametrize('parallel', [False, True])
+    def test_stream_to_zarr(self, tmpdir, parallel):
+        pytest.importorskip('zarr')
+        store = str(tmpdir.join('stream.zarr'))
+        combos = (('a', [1, 2]),
+                  ('b', [10, 20, 30]))
+        kws = dict(var_names=['bananas', 'cakes'],
+                   var_dims={'bananas': ['sugar']},
+                   var_coords={'sugar': [*range(10)]},
+                   attrs={'fruit': 'yes'})
+
+        eds = combo_runner_to_ds(foo2_array_bool, combos, **kws)
+        ds = combo_runner_to_ds(foo2_array_bool, combos, **kws,
+                                stream_to=store, stream_every=4,
+                                parallel=parallel)
+
+        assert ds.attrs['fruit'] == 'yes'
+        assert ds['cakes'].dtype == float
+        assert_allclose(ds['bananas'].values, eds['bananas'].values)
+        assert_allclose(ds['cakes'].values, eds['cakes'].values)
+
+    @pytest.mark.parametrize('chunksize', [None, 2])
+    def test_stream_to_zarr_bounded_memory(self, tmpdir, chunksize):
+        pytest.importorskip('zarr')
+        tracemalloc = pytest.importorskip('tracemalloc')
+        from concurrent.futures import ThreadPoolExecutor
+
+        store = str(tmpdir.join('stream.zarr'))
+        size = 100000  # 0.8 MB per result
+
+        def fn(a):
+            return np.full(size, float(a))
+
+        tracemalloc.start()
+        try:
+            with ThreadPoolExecutor(2) as executor:
+                ds = combo_runner_to_ds(
+                    fn, {'a': range(200)}, var_names='x', var_dims=['i'],
+                    var_coords={'i': range(size)}, stream_to=store,
+                    stream_every=5, executor=executor, chunksize=chunksize)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        # far fewer than all 200 results were ever held at once
+        assert peak < 100 * 8 * size
+        assert_allclose(ds['x'].isel(i=0).values, np.arange(200))
+
+    def test_stream_to_zarr_resume(self, tmpdir):
+        zarr = pytest.importorskip('zarr')
+        store = str(tmpdir.join('stream.zarr'))
+        combos = (('a', [1, 2, 3]),
+                  ('b', [10, 20, 30]))
+
+        evaluated = []
+
+        def fn(a, b):
+            evaluated.append((a, b))
+            return a + b
+
+        combo_runner_to_ds(fn, combos, var_names='x', stream_to=store)
+        assert len(evaluated) == 9
+
+        # simulate an interrupted run
+        zarr.open_group(store, mode='r+')['x'][1:, 2] = np.nan
+
+        evaluated.clear()
+        ds = combo_runner_to_ds(fn, combos, var_names='x', stream_to=store)
+        assert sorted(evaluated) == [(2, 30), (3, 30)]
+        assert_allclose(ds['x'].values,
+                        np.array([[1], [2], [3]]) + np.array([10, 20, 30]))
+
+        with pytest.raises(ValueError):
+            combo_runner_to_ds(fn, (('a', [1, 2, 4]), ('b', [10, 20, 30])),
+                               var_names='x', stream_to=store)
+
     def test_when_results_are_xobjs(self):
 
         def fn_ds(a, b):
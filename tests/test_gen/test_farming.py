@@ -5,6 +5,7 @@ from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 import numpy as np
+import dask.array as da
 import xarray as xr
 
 from xyzpy.manage import load_ds, load_df
@@ -25,6 +26,17 @@ def fn3_fba(a, b, c):
     return sm, int(ev), ts
 
 
+def _harvest_a_b(data_name, a, b, **harvester_opts):
+    r = Runner(fn3_fba, fn_args=('a', 'b'),
+               var_names=['sum', 'even', 'array'],
+               var_dims={'array': ['time']},
+               var_coords={'time': np.linspace(0, 1.0, 3)},
+               constants={'c': 100},
+               attrs={'fruit': 'apples'})
+    h = Harvester(r, data_name, **harvester_opts)
+    h.harvest_combos((('a', (a,)), ('b', (b,))))
+
+
 @pytest.fixture
 def fn3_fba_runner():
     r = Runner(fn3_fba, fn_args=('a', 'b'),
@@ -259,6 +271,30 @@ class TestHarvester:
         assert h.full_ds.identical(fn3_fba_ds)
         assert hds.identical(fn3_fba_ds)
 
+    def test_harvest_combos_skip_existing(self, fn3_fba_runner, fn3_fba_ds):
+        evaluated = []
+
+        def fn(a, b, c):
+            evaluated.append((a, b))
+            return fn3_fba(a, b, c)
+
+        fn3_fba_runner.fn = fn
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fl_pth = os.path.join(tmpdir, 'test.h5')
+            h = Harvester(fn3_fba_runner, fl_pth)
+            h.harvest_combos((('a', (1, 2)), ('b', (3,))), skip_existing=True)
+            assert len(evaluated) == 2
+            h.harvest_combos((('a', (1, 2)), ('b', (3, 4))),
+                             skip_existing=True)
+            assert sorted(evaluated[2:]) == [(1, 4), (2, 4)]
+            h.harvest_combos((('a', (2, 1)), ('b', (4, 3))),
+                             skip_existing=True)
+            assert len(evaluated) == 4
+            hds = load_ds(fl_pth)
+        assert h.full_ds.equals(fn3_fba_ds)
+        assert hds.equals(fn3_fba_ds)
+
     def test_harvest_combos_overwrite(self, fn3_fba_runner, fn3_fba_ds):
         with tempfile.TemporaryDirectory() as tmpdir:
             fl_pth = os.path.join(tmpdir, 'test.h5')
@@ -270,6 +306,189 @@ class TestHarvester:
             h.harvest_combos((('a', (1,)), ('b', (3,))), overwrite=True)
             assert h.full_ds.equals(fn3_fba_ds)
 
+    def test_harvest_combos_sharded(self, fn3_fba_runner, fn3_fba_ds):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            data_dir = os.path.join(tmpdir, 'test_data')
+            h = Harvester(fn3_fba_runner, data_dir, sharded=True)
+            h.harvest_combos((('a', (1,)), ('b', (3, 4))))
+            h.harvest_combos((('a', (2,)), ('b', (3, 4))))
+            assert len(os.listdir(data_dir)) == 3  # + manifest
+            assert h.full_ds.identical(fn3_fba_ds)
+
+            # new shard with conflicting data, overwriting
+            mod_ds = fn3_fba_ds.copy(deep=True)
+            mod_ds['array'].loc[{'a': 1, 'b': 3}] = 999
+            h.add_ds(mod_ds, overwrite=True)
+            assert h.full_ds.equals(mod_ds)
+            h.add_ds(fn3_fba_ds, overwrite=False)
+            assert h.full_ds.equals(mod_ds)
+
+            # conflicting data is rejected, and its shard removed
+            with pytest.raises(xr.MergeError):
+                h.add_ds(fn3_fba_ds)
+            assert len(os.listdir(data_dir)) == 5
+
+            # reloading from disk respects the order of the shards
+            h2 = Harvester(fn3_fba_runner, data_dir, sharded=True)
+            assert h2.full_ds.equals(mod_ds)
+
+            # consolidating into a single shard
+            h2.harvest_combos((('a', (2,)), ('b', (3, 4))))
+            h2.save_full_ds()
+            assert len(os.listdir(data_dir)) == 2
+            h3 = Harvester(fn3_fba_runner, data_dir, sharded=True)
+            assert h3.full_ds.equals(mod_ds)
+
+            h3.delete_ds()
+            assert not os.path.exists(data_dir)
+
+    @pytest.mark.parametrize('harvester_opts', [
+        {'lock': True},
+        {'write_ahead': True},
+        {'write_ahead': True, 'sharded': True},
+    ])
+    def test_harvest_concurrent_processes(self, fn3_fba_runner, fn3_fba_ds,
+                                          harvester_opts):
+        import concurrent.futures as cf
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            data_name = os.path.join(tmpdir, 'test.h5')
+            with cf.ProcessPoolExecutor(4) as pool:
+                fs = [pool.submit(_harvest_a_b, data_name, a, b,
+                                  **harvester_opts)
+                      for a in (1, 2) for b in (3, 4)]
+                for f in fs:
+                    f.result()
+
+            h = Harvester(fn3_fba_runner, data_name, **harvester_opts)
+            if harvester_opts.get('write_ahead'):
+                assert h._queued() == []
+            assert h.full_ds.equals(fn3_fba_ds)
+
+    @pytest.mark.parametrize('sharded', [False, True])
+    def test_harvest_write_ahead_conflict(self, fn3_fba_runner, fn3_fba_ds,
+                                          sharded):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            data_name = os.path.join(tmpdir, 'test.h5')
+            h = Harvester(fn3_fba_runner, data_name, write_ahead=True,
+                          sharded=sharded)
+            h.harvest_combos((('a', (1,)), ('b', (3, 4))))
+
+            mod_ds = fn3_fba_ds.sel(a=[1]).copy(deep=True)
+            mod_ds['sum'][...] = 999
+
+            # conflicting data queued by another process doesn't block us
+            name = h._enqueue(mod_ds)
+            h.harvest_combos((('a', (2,)), ('b', (3, 4))))
+            assert h._queued() == []
+            assert h.full_ds.equals(fn3_fba_ds)
+            assert name in os.listdir(h._failed_dir)
+
+            # but is raised in the process that queued it
+            with pytest.raises(xr.MergeError):
+                h._raise_if_failed(name)
+            with pytest.raises(xr.MergeError):
+                h.add_ds(mod_ds)
+            assert h.full_ds.equals(fn3_fba_ds)
+
+    @pytest.mark.parametrize('background', [False, True])
+    def test_harvest_sharded_consolidate(self, fn3_fba_runner, fn3_fba_ds,
+                                         background):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            data_dir = os.path.join(tmpdir, 'test_data')
+            h = Harvester(fn3_fba_runner, data_dir, sharded=True)
+            h.harvest_combos((('a', (1,)), ('b', (3,))))
+            h.harvest_combos((('a', (1,)), ('b', (4,))))
+            h.harvest_combos((('a', (2,)), ('b', (3, 4))))
+            assert isinstance(h.full_ds['array'].data, da.Array)
+            assert h.full_ds.identical(fn3_fba_ds)
+            assert len(h._read_manifest()) == 3
+
+            thread = h.consolidate(background=background)
+            if background:
+                thread.join()
+            assert len(h._read_manifest()) == 1
+            assert len(os.listdir(data_dir)) == 2
+            assert h.full_ds.identical(fn3_fba_ds)
+
+    def test_harvest_sharded_consolidate_keeps_new(self, fn3_fba_runner,
+                                                   fn3_fba_ds):
+        import json
+        from xyzpy.gen.farming import _file_lock
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            data_dir = os.path.join(tmpdir, 'test_data')
+            h = Harvester(fn3_fba_runner, data_dir, sharded=True)
+            h.harvest_combos((('a', (1,)), ('b', (3,))))
+            h.harvest_combos((('a', (1,)), ('b', (4,))))
+
+            # another process holds the manifest, appending a new shard
+            with _file_lock(data_dir + '.manifest.lock'):
+                thread = h.consolidate(background=True)
+                time.sleep(0.5)
+                assert thread.is_alive()
+                entry = h._write_shard(fn3_fba_ds.sel(a=[2]), 'h5netcdf')
+                entry['overwrite'] = None
+                with open(h._manifest_path, 'a') as f:
+                    f.write(json.dumps(entry) + '\n')
+
+            thread.join()
+            assert len(h._read_manifest()) == 2
+            assert h.full_ds.identical(fn3_fba_ds)
+
+    def test_harvest_sharded_conflict_concurrent(self, fn3_fba_runner,
+                                                 fn3_fba_ds):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            data_dir = os.path.join(tmpdir, 'test_data')
+            h = Harvester(fn3_fba_runner, data_dir, sharded=True, lock=True)
+            h2 = Harvester(fn3_fba_runner, data_dir, sharded=True, lock=True)
+
+            mod_ds = fn3_fba_ds.sel(a=[1]).copy(deep=True)
+            mod_ds['sum'][...] = 999
+            write_shard = h._write_shard
+
+            def racing_write_shard(ds, engine):
+                # another harvester adds conflicting data meanwhile
+                h2.add_ds(mod_ds)
+                return write_shard(ds, engine)
+
+            h._write_shard = racing_write_shard
+            with pytest.raises(xr.MergeError):
+                h.add_ds(fn3_fba_ds)
+
+            assert len(h._read_manifest()) == 1
+            assert len(os.listdir(data_dir)) == 2
+            assert h.full_ds.equals(mod_ds)
+
+    def test_harvest_sharded_consolidate_concurrent(self, fn3_fba_runner,
+                                                    fn3_fba_ds):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            data_dir = os.path.join(tmpdir, 'test_data')
+            h = Harvester(fn3_fba_runner, data_dir, sharded=True)
+            h.harvest_combos((('a', (1,)), ('b', (3,))))
+            h.harvest_combos((('a', (1,)), ('b', (4,))))
+
+            # h starts consolidating ...
+            shards = h._read_manifest()
+            ds = h._combine_shards(shards)
+
+            # ... whilst another harvester consolidates and adds new data
+            h2 = Harvester(fn3_fba_runner, data_dir, sharded=True)
+            h2.consolidate()
+            h2.harvest_combos((('a', (2,)), ('b', (3, 4))))
+
+            # the stale consolidation is abandoned
+            assert not h._replace_shards(ds, old_shards=shards)
+            assert len(h._read_manifest()) == 2
+            assert len(os.listdir(data_dir)) == 3
+            assert h.full_ds.identical(fn3_fba_ds)
+
+            # stale shards are no problem for consolidating either
+            h.consolidate()
+            assert len(h._read_manifest()) == 1
+            assert len(os.listdir(data_dir)) == 2
+            assert h.full_ds.identical(fn3_fba_ds)
+
     @pytest.mark.parametrize('dict_cases', [False, True])
     def test_harvest_cases_new(self, fn3_fba_runner, fn3_fba_ds, dict_cases):
 
@@ -383,6 +602,148 @@ class TestSampler:
             for col in ['sum', 'diff', 'divisor', 'const', 'a', 'b', 'c']:
                 assert col in s.full_df
 
+    @pytest.mark.parametrize('method', ['random', 'sobol', 'lhs'])
+    def test_gen_cases_fnargs(self, method):
+        s = Sampler(fn3_fba, default_combos={'a': range(8)})
+
+        def b_dist(size, rng):
+            return rng.normal(size=size)
+
+        combos = {'b': b_dist, 'c': lambda: 7}
+        fn_args, cases = s.gen_cases_fnargs(16, combos, seed=42,
+                                            method=method)
+        assert fn_args == ('a', 'b', 'c')
+        assert len(cases) == 16
+        assert all(c == 7 for _, _, c in cases)
+        assert len(set(b for _, b, _ in cases)) == 16
+
+        # reproducible
+        _, cases2 = s.gen_cases_fnargs(16, combos, seed=42, method=method)
+        assert cases == cases2
+
+        # reproducible with the global seed too
+        np.random.seed(42)
+        _, cases3 = s.gen_cases_fnargs(16, combos, method=method)
+        np.random.seed(42)
+        _, cases4 = s.gen_cases_fnargs(16, combos, method=method)
+        assert cases3 == cases4
+
+        if method != 'random':
+            # low discrepancy -> every value chosen exactly twice
+            counts = np.bincount([a for a, _, _ in cases])
+            assert (counts == 2).all()
+
+    def test_gen_cases_fnargs_old_numpy(self, monkeypatch):
+        # numpy < 1.17 has no ``Generator``
+        monkeypatch.delattr(np.random, 'default_rng')
+        s = Sampler(fn3_fba, default_combos={'a': range(8)})
+
+        def b_dist(rng):
+            return rng.normal()
+
+        combos = {'b': b_dist, 'c': [7]}
+        _, cases = s.gen_cases_fnargs(16, combos, seed=42)
+        _, cases2 = s.gen_cases_fnargs(16, combos, seed=42)
+        assert len(cases) == 16
+        assert cases == cases2
+
+    def test_gen_cases_fnargs_no_qmc(self, monkeypatch):
+        import sys
+        import scipy.stats
+        monkeypatch.delattr(scipy.stats, 'qmc', raising=False)
+        monkeypatch.setitem(sys.modules, 'scipy.stats.qmc', None)
+        s = Sampler(fn3_fba, default_combos={'a': range(8)})
+        with pytest.raises(ImportError, match='scipy>=1.7'):
+            s.gen_cases_fnargs(16, {'b': [1], 'c': [7]}, method='sobol')
+
+    def test_gen_cases_fnargs_bad_method(self):
+        s = Sampler(fn3_fba, default_combos={'a': range(8)})
+        with pytest.raises(ValueError):
+            s.gen_cases_fnargs(16, method='grid')
+
+    @pytest.mark.parametrize('with_file', [False, True])
+    def test_sample_adaptive(self, with_file):
+
+        @label(var_names=['y'])
+        def step(x):
+            return np.tanh((x - 0.3) / 0.01)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fl_pth = os.path.join(tmpdir, 'test.pkl') if with_file else None
+            s = Sampler(step, fl_pth,
+                        default_combos={'x': np.linspace(0, 1, 1001)})
+            df = s.sample_adaptive(50, batchsize=5, seed=7)
+            assert len(df) == len(s.full_df) == 50
+            assert len(set(df['x'])) == 50
+
+            # many more points should be chosen near the step than the ~10%
+            #     that would be if uniformly sampled
+            near_step = (abs(df['x'] - 0.3) < 0.05).mean()
+            assert near_step > 0.3
+
+    def test_sample_combos_parquet(self):
+        pytest.importorskip('pyarrow')
+
+        @label(var_names=['sum', 'diff', 'divisor', 'const'],
+               constants={'c': 42})
+        def sum_diff(a, b, c):
+            return a + b, a - b, a % b == 0, c
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            data_dir = os.path.join(tmpdir, 'test_samples')
+            s = Sampler(sum_diff, data_dir, engine='parquet')
+            combos = (
+                ('a', (1, 2, 3, 4, 5)),
+                ('b', lambda: np.random.randint(10, 20))
+            )
+            s.sample_combos(10, combos)
+            assert s.last_df.equals(s.full_df)
+
+            s.sample_combos(20, combos)
+            assert len(os.listdir(data_dir)) == 2
+            hdf = load_df(data_dir, engine='parquet')
+            assert len(hdf) == 30
+            assert s.full_df.equals(hdf)
+            assert s.full_df.iloc[10:].reset_index(drop=True).equals(
+                s.last_df)
+
+            # only load some of the columns
+            sub_df = s.read_df(columns=['a', 'sum'])
+            assert list(sub_df.columns) == ['a', 'sum']
+            assert sub_df.equals(hdf[['a', 'sum']])
+
+            # combine the parts into one
+            s.save_full_df()
+            assert len(os.listdir(data_dir)) == 1
+            assert load_df(data_dir, engine='parquet').equals(hdf)
+
+            s.delete_df()
+            assert not os.path.exists(data_dir)
+
+    def test_sample_combos_parquet_promote(self):
+        pytest.importorskip('pyarrow')
+
+        @label(var_names=['x'])
+        def half(a):
+            return a / 2 if a > 5 else a // 2
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            data_dir = os.path.join(tmpdir, 'test_samples')
+            s = Sampler(half, data_dir, engine='parquet')
+            s.sample_combos(5, [('a', [1, 2, 3])])
+            s.sample_combos(5, [('a', [7, 9])])
+            assert s.read_df()['x'].dtype == float
+
+            # combine the parts without loading them first
+            s = Sampler(half, data_dir, engine='parquet')
+            s.save_full_df()
+            assert len(os.listdir(data_dir)) == 1
+            df = load_df(data_dir, engine='parquet')
+            assert len(df) == 10
+            assert df['x'].dtype == float
+
+            s.delete_df()
+
     @pytest.mark.parametrize('batchsize', [1, 3])
     def test_sow_reap_samples(self, batchsize):
 
@@ -0,0 +1,69 @@
+import gc
+import os
+import pickle
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from xyzpy.gen.combo_runner import combo_runner
+from xyzpy.gen.shared import (
+    _ATTACHED, SharedArray, attach_shared_array, shared_arrays)
+
+
+def sum_with_big(a, big):
+    return (a + big.sum(), isinstance(big, SharedArray))
+
+
+class TestSharedArrays:
+
+    def test_pickle_by_path(self):
+        big = np.random.rand(1000, 1000)
+        with shared_arrays({'big': big, 'small': np.ones(3), 'c': 1}) as kws:
+            assert isinstance(kws['big'], SharedArray)
+            assert not isinstance(kws['small'], SharedArray)
+            assert kws['c'] == 1
+            path = kws['big']._xyz_shared_path
+            assert os.path.exists(path)
+
+            data = pickle.dumps(kws['big'])
+            assert len(data) < 1000
+            assert_allclose(pickle.loads(data), big)
+
+            # views are pickled as normal arrays
+            view = pickle.loads(pickle.dumps(kws['big'][:2]))
+            assert not isinstance(view, SharedArray)
+            assert_allclose(view, big[:2])
+
+        assert not os.path.exists(path)
+
+    def test_attached_released(self, tmpdir):
+        path = str(tmpdir.join('big.npy'))
+        np.save(path, np.random.rand(100, 100))
+        # e.g. unpickled by a task in a reused worker
+        x = attach_shared_array(path)
+        assert attach_shared_array(path) is x
+        del x
+        gc.collect()
+        # no longer in use -> not kept mapped
+        assert path not in _ATTACHED
+
+    def test_cleanup_permission_error(self, monkeypatch):
+
+        def remove(path):
+            raise PermissionError(path)
+
+        big = np.random.rand(1000, 1000)
+        with shared_arrays({'big': big}) as kws:
+            path = kws['big']._xyz_shared_path
+            monkeypatch.setattr(os, 'remove', remove)
+        monkeypatch.undo()
+        assert os.path.exists(path)
+        os.remove(path)
+
+    def test_combo_runner(self):
+        big = np.random.rand(500, 500)
+        x, shared = combo_runner(sum_with_big, {'a': [1, 2, 3]},
+                                 constants={'big': big}, num_workers=2,
+                                 split=True, share_arrays=True)
+        assert_allclose(x, [1 + big.sum(), 2 + big.sum(), 3 + big.sum()])
+        assert all(shared)
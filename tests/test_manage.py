@@ -90,6 +90,24 @@ class TestSaveAndLoad:
             ds2 = load_ds(os.path.join(tmpdir, "test.h5"), engine=engine_load)
             assert ds1.identical(ds2)
 
+    @mark.parametrize("engine", ['h5netcdf', 'zarr', 'joblib'])
+    def test_save_is_atomic(self, ds_real, engine):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, "test.h5")
+            save_ds(ds_real, fname, engine=engine)
+            save_ds(ds_real + 1, fname, engine=engine)
+            assert os.listdir(tmpdir) == ["test.h5"]
+            ds2 = load_ds(fname, engine=engine)
+            assert (ds_real + 1).equals(ds2)
+
+            # a failed write leaves the old data in place
+            bad_ds = ds_real.assign_attrs(bad=lambda: None)
+            with raises(Exception):
+                save_ds(bad_ds, fname, engine=engine)
+            assert os.listdir(tmpdir) == ["test.h5"]
+            ds3 = load_ds(fname, engine=engine)
+            assert (ds_real + 1).equals(ds3)
+
     @mark.parametrize(("engine_load"),
                       ['h5netcdf', 'netcdf4'])
     def test_dask_load(self, ds_real, engine_load):
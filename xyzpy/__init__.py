@@ -25,6 +25,9 @@ from .gen.case_runner import (
     find_missing_cases,
     fill_missing_cases
 )
+from .gen.cache import (
+    ResultCache,
+)
 from .gen.batch import (
     Crop,
     grow,
@@ -119,6 +122,7 @@ __all__ = [
     "Crop",
     "grow",
     "load_crops",
+    "ResultCache",
     "cache_to_disk",
     "save_ds",
     "load_ds",
@@ -8,8 +8,13 @@ import warnings
 import pickle
 import copy
 import math
+import time
+import contextlib
 import functools
 import warnings
+import itertools
+import collections
+from concurrent.futures import ThreadPoolExecutor
 
 import joblib
 from joblib.externals import cloudpickle
@@ -17,12 +22,12 @@ import numpy as np
 import xarray as xr
 
 from ..utils import _get_fn_name, prod, progbar
+from ..manage import _atomic_path
 from .combo_runner import (
     _combo_runner,
     combo_runner_to_ds,
 )
 from .case_runner import (
-    _case_runner,
     case_runner_to_ds,
 )
 from .prepare import (
@@ -31,13 +36,178 @@ from .prepare import (
     _parse_attrs,
     _parse_cases,
 )
-from .farming import Runner, Harvester, Sampler
+from .farming import Runner, Harvester, Sampler, _merge_datasets
 
 
 BTCH_NM = "xyz-batch-{}.jbdmp"
 RSLT_NM = "xyz-result-{}.jbdmp"
 FNCT_NM = "xyz-function.clpkl"
 INFO_NM = "xyz-settings.jbdmp"
+CNST_NM = "xyz-constants.jbdmp"
+PRGS_NM = "xyz-progress.bin"
+PACK_NM = "xyz-batches.pack"
+PIDX_NM = "xyz-batches.idx"
+
+# each packed batch is indexed by its (offset, nbytes, ncases)
+_PIDX_DTYPE = np.dtype('<i8')
+_PIDX_ENTRY = 3 * _PIDX_DTYPE.itemsize
+
+# the states of each batch in the progress index, ``_MERGED`` batches have
+#     been grown and then incrementally reaped into the farmer's data
+_SOWN, _GROWN, _MERGED = 1, 3, 7
+
+
+def _init_progress(location, num_batches):
+    """Create a blank progress index for ``num_batches`` batches - one byte
+    per batch, which is either 0, ``_SOWN``, ``_GROWN`` or ``_MERGED``.
+    """
+    with _atomic_path(os.path.join(location, PRGS_NM)) as tmp_file:
+        with open(tmp_file, 'wb') as f:
+            f.write(bytes(num_batches))
+
+
+def _mark_progress(location, batch_number, state):
+    """Record the ``state`` of batch ``batch_number`` in the progress index,
+    if there is one. Each batch is a single byte, so this is atomic.
+    """
+    try:
+        with open(os.path.join(location, PRGS_NM), 'r+b') as f:
+            f.seek(int(batch_number) - 1)
+            f.write(bytes((state,)))
+    except FileNotFoundError:
+        # e.g. crop sown by an older version
+        pass
+
+
+def _batch_ranges(num_cases, batchsize, batch_remainder):
+    """Yield the ``(start, stop)`` flat indices of the cases in each batch,
+    distributing any remainder among the first batches.
+    """
+    start = 0
+    batch_counter = 0
+    while start < num_cases:
+        extra_batch = batch_counter < batch_remainder
+        stop = min(start + batchsize + int(extra_batch), num_cases)
+        yield start, stop
+        start = stop
+        batch_counter += 1
+
+
+def _encode_column(values):
+    """Store a column of argument values as a numpy array where this can be
+    done losslessly, else as a plain list. Returns ``(codec, data)``.
+    """
+    kinds = {type(v) for v in values}
+    if len(kinds) == 1:
+        kind, = kinds
+        if kind in (bool, int, float, complex):
+            col = np.array(values)
+            if col.dtype.kind in 'biufc':
+                return 'py', col
+        elif issubclass(kind, np.number) or kind is np.bool_:
+            return 'np', np.array(values)
+    return 'list', list(values)
+
+
+def _decode_column(codec, data):
+    if codec == 'py':
+        return data.tolist()
+    if codec == 'np':
+        return list(data)
+    return data
+
+
+def _encode_cases(fn_args, cases):
+    """Compactly encode a batch of ``cases`` as columns - one per argument.
+    Cases given as dicts with differing keys are just stored as a list.
+    """
+    if isinstance(cases[0], dict):
+        fn_args = tuple(cases[0])
+        if any(c.keys() != cases[0].keys() for c in cases):
+            return {'_xyz_format': 'kwargs', 'cases': list(cases)}
+        cases = [tuple(c[k] for k in fn_args) for c in cases]
+
+    return {
+        '_xyz_format': 'columns',
+        'ncases': len(cases),
+        'columns': {arg: _encode_column(values)
+                    for arg, values in zip(fn_args, zip(*cases))},
+    }
+
+
+def _decode_batch(location, batch):
+    """Reconstruct the list of kwargs for each case of a loaded ``batch``,
+    which is either already such a list (as sown by older versions), a range
+    of flat indices into the sown combos, columns of the sown cases, or a
+    list of the sown cases, the last three all without constants.
+    """
+    if not isinstance(batch, dict):
+        return batch
+
+    try:
+        constants = joblib.load(os.path.join(location, CNST_NM))
+    except FileNotFoundError:
+        constants = {}
+
+    if batch['_xyz_format'] == 'kwargs':
+        return [{**case, **constants} for case in batch['cases']]
+
+    if batch['_xyz_format'] == 'range':
+        combos = joblib.load(os.path.join(location, INFO_NM))['combos']
+        names = [name for name, _ in combos]
+        values = [vals for _, vals in combos]
+        shape = [len(vals) for vals in values]
+
+        ixs = np.unravel_index(np.arange(batch['start'], batch['stop']),
+                               shape)
+        columns = [[vals[i] for i in ix.tolist()]
+                   for vals, ix in zip(values, ixs)]
+    else:
+        names = list(batch['columns'])
+        columns = [_decode_column(*batch['columns'][name])
+                   for name in names]
+
+    return [{**dict(zip(names, case)), **constants}
+            for case in zip(*columns)]
+
+
+def _load_batch(location, batch_number):
+    """Load the cases of batch ``batch_number``, either from its own file or,
+    if the crop was sown packed, from its slice of the single packed file,
+    and expand them into a list of kwargs for each case.
+    """
+    return _decode_batch(location, _load_raw_batch(location, batch_number))
+
+
+def _load_raw_batch(location, batch_number):
+    batches_dir = os.path.join(location, "batches")
+    index_file = os.path.join(batches_dir, PIDX_NM)
+
+    if not os.path.isfile(index_file):
+        return joblib.load(
+            os.path.join(batches_dir, BTCH_NM.format(batch_number)))
+
+    with open(index_file, 'rb') as f:
+        f.seek((int(batch_number) - 1) * _PIDX_ENTRY)
+        entry = f.read(_PIDX_ENTRY)
+
+    if len(entry) < _PIDX_ENTRY:
+        raise XYZError("Batch {} has not been sown.".format(batch_number))
+
+    offset, nbytes, _ = np.frombuffer(entry, dtype=_PIDX_DTYPE)
+    with open(os.path.join(batches_dir, PACK_NM), 'rb') as f:
+        f.seek(offset)
+        return pickle.loads(f.read(nbytes))
+
+
+def _read_progress(location):
+    """Read the progress index, or return None if there isn't one.
+    """
+    try:
+        with open(os.path.join(location, PRGS_NM), 'rb') as f:
+            return np.frombuffer(f.read(), dtype=np.uint8)
+    except FileNotFoundError:
+        return None
 
 
 class XYZError(Exception):
@@ -190,6 +360,14 @@ class Crop(object):
     autoload : bool, optional
         If True, check for the existence of a Crop written to disk
         with the same location, and if found, load it.
+    progress_ttl : float, optional
+        How many seconds to reuse the progress of the crop for (e.g. the
+        number of results) before checking the disk again. By default
+        always check.
+    packed : bool, optional
+        If True, sow all the batches into a single file, with an index of
+        where each batch is, rather than a file per batch. This is much
+        kinder to (e.g. cluster) filesystems when there are many batches.
 
     See Also
     --------
@@ -204,9 +382,17 @@ class Crop(object):
                  batchsize=None,
                  num_batches=None,
                  farmer=None,
-                 autoload=True):
+                 autoload=True,
+                 progress_ttl=0.0,
+                 packed=False):
 
         self._fn, self.farmer = _parse_fn_farmer(fn, farmer)
+        self.progress_ttl = progress_ttl
+        self.packed = packed
+        self._progress = None
+        self._progress_time = -math.inf
+        # batches incrementally reaped only into the farmer's in-memory data
+        self._merged_in_memory = set()
 
         self.name = name
         self.parent_dir = parent_dir
@@ -363,7 +549,7 @@ class Crop(object):
                                "disk but its farmer already has a function "
                                "set: {}.".format(self._fn, self.farmer.fn))
 
-    def prepare(self, combos=None, cases=None, fn_args=None):
+    def prepare(self, combos=None, cases=None, fn_args=None, constants=None):
         """Write information about this crop and the supplied combos to disk.
         Typically done at start of sow, not when Crop instantiated.
         """
@@ -371,6 +557,17 @@ class Crop(object):
         if self.save_fn:
             self.save_function_to_disk()
         self.save_info(combos=combos, cases=cases, fn_args=fn_args)
+        # stored once, rather than with every case
+        joblib.dump({} if constants is None else constants,
+                    os.path.join(self.location, CNST_NM))
+        _init_progress(self.location, self.num_batches)
+
+        # make sure an old packed index doesn't shadow new batch files
+        if not self.packed:
+            for name in (PIDX_NM, PACK_NM):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.location, "batches", name))
+        self._progress_time = -math.inf
 
     def is_prepared(self):
         """Check whether this crop has been written to disk.
@@ -379,29 +576,56 @@ class Crop(object):
 
     def calc_progress(self):
         """Calculate how much progressed has been made in growing the cases.
+        This is read from the progress index that sowing and growing keep
+        up to date, falling back to listing the batch and result files for
+        crops sown without one. The answer is reused for ``progress_ttl``
+        seconds.
         """
+        if time.monotonic() - self._progress_time < self.progress_ttl:
+            return
+
         if self.is_prepared():
             self._sync_info_from_disk()
-            self._num_sown_batches = len(glob(
-                os.path.join(self.location, "batches", BTCH_NM.format("*"))))
-            self._num_results = len(glob(
-                os.path.join(self.location, "results", RSLT_NM.format("*"))))
+            progress = _read_progress(self.location)
+
+            if progress is not None:
+                self._progress = progress
+                self._num_sown_batches = int(np.count_nonzero(progress))
+                self._num_results = int(np.count_nonzero(progress >= _GROWN))
+            else:
+                self._progress = None
+                index_file = os.path.join(self.location, "batches", PIDX_NM)
+                if os.path.isfile(index_file):
+                    self._num_sown_batches = (
+                        os.path.getsize(index_file) // _PIDX_ENTRY)
+                else:
+                    self._num_sown_batches = len(glob(os.path.join(
+                        self.location, "batches", BTCH_NM.format("*"))))
+                self._num_results = len(glob(os.path.join(
+                    self.location, "results", RSLT_NM.format("*"))))
         else:
+            self._progress = None
             self._num_sown_batches = -1
             self._num_results = -1
 
+        self._progress_time = time.monotonic()
+
     def is_ready_to_reap(self):
         self.calc_progress()
         return (
             self._num_results > 0 and
-            (self._num_results == self.num_sown_batches)
+            (self._num_results == self._num_sown_batches)
         )
 
     def missing_results(self):
-        """
+        """Find the batch numbers which don't have results yet.
         """
         self.calc_progress()
 
+        if self._progress is not None:
+            return tuple(int(i) + 1 for i in
+                         np.flatnonzero(self._progress < _GROWN))
+
         def no_result_exists(x):
             return not os.path.isfile(
                 os.path.join(self.location, "results", RSLT_NM.format(x)))
@@ -488,11 +712,19 @@ class Crop(object):
         combos = sorted(combos, key=lambda x: x[0])
 
         self.choose_batch_settings(combos=combos)
-        self.prepare(combos=combos)
+        self.prepare(combos=combos, constants=constants)
+
+        # each batch is just a range of flat indices into ``combos``
+        num_cases = prod(len(vals) for _, vals in combos)
+        ranges = _batch_ranges(num_cases, self.batchsize,
+                               self._batch_remainder)
 
-        with Sower(self) as sow_fn:
-            _combo_runner(fn=sow_fn, combos=combos, constants=constants,
-                          verbosity=verbosity)
+        with Sower(self) as sower:
+            for start, stop in progbar(ranges, disable=verbosity <= 0,
+                                       total=self.num_batches):
+                sower.save_record({'_xyz_format': 'range',
+                                   'start': start, 'stop': stop},
+                                  ncases=stop - start)
 
     def sow_cases(self, fn_args, cases, constants=None, verbosity=1):
         cases = _parse_cases(cases)
@@ -500,14 +732,22 @@ class Crop(object):
         constants = self.parse_constants(constants)
 
         self.choose_batch_settings(cases=cases)
-        self.prepare(fn_args=fn_args, cases=cases)
-
-        with Sower(self) as sow_fn:
-            _case_runner(fn=sow_fn, fn_args=fn_args, cases=cases,
-                         constants=constants, verbosity=verbosity)
-
-    def sow_samples(self, n, combos=None, constants=None, verbosity=1):
-        fn_args, cases = self.farmer.gen_cases_fnargs(n, combos)
+        self.prepare(fn_args=fn_args, cases=cases, constants=constants)
+
+        # each batch is stored as columns of its cases
+        ranges = _batch_ranges(len(cases), self.batchsize,
+                               self._batch_remainder)
+
+        with Sower(self) as sower:
+            for start, stop in progbar(ranges, disable=verbosity <= 0,
+                                       total=self.num_batches):
+                sower.save_record(_encode_cases(fn_args, cases[start:stop]),
+                                  ncases=stop - start)
+
+    def sow_samples(self, n, combos=None, constants=None, verbosity=1,
+                    seed=None, method='random'):
+        fn_args, cases = self.farmer.gen_cases_fnargs(n, combos, seed=seed,
+                                                      method=method)
         self.sow_cases(fn_args, cases,
                        constants=constants, verbosity=verbosity)
 
@@ -526,7 +766,8 @@ class Crop(object):
         """
         self.grow(batch_ids=self.missing_results(), **combo_runner_opts)
 
-    def reap_combos(self, wait=False, clean_up=None, allow_incomplete=False):
+    def reap_combos(self, wait=False, clean_up=None, allow_incomplete=False,
+                    num_threads=None):
         """Reap already sown and grown results from this crop.
 
         Parameters
@@ -541,6 +782,10 @@ class Crop(object):
         allow_incomplete : bool, optional
             Allow only partially completed crop results to be reaped,
             incomplete results will all be filled-in as nan.
+        num_threads : int, optional
+            If given, load this many result files at once using a pool of
+            threads, a bounded number of files ahead of where they are
+            needed.
 
         Returns
         -------
@@ -557,7 +802,8 @@ class Crop(object):
         settings = joblib.load(os.path.join(self.location, INFO_NM))
 
         with Reaper(self, num_batches=settings['num_batches'],
-                    wait=wait, default_result=default_result) as reap_fn:
+                    wait=wait, default_result=default_result,
+                    num_threads=num_threads) as reap_fn:
 
             results = _combo_runner(fn=reap_fn, constants={},
                                     combos=settings['combos'])
@@ -576,7 +822,9 @@ class Crop(object):
                           parse=True,
                           wait=False,
                           clean_up=None,
-                          allow_incomplete=False):
+                          allow_incomplete=False,
+                          num_threads=None,
+                          stream_to=None):
         """Reap a function over sowed combinations and output to a Dataset.
 
         Parameters
@@ -608,6 +856,15 @@ class Crop(object):
         allow_incomplete : bool, optional
             Allow only partially completed crop results to be reaped,
             incomplete results will all be filled-in as nan.
+        num_threads : int, optional
+            If given, load this many result files at once using a pool of
+            threads, a bounded number of files ahead of where they are
+            needed.
+        stream_to : str, optional
+            If given, the path of a new zarr store to write the results into
+            as they are loaded, rather than holding them all in memory. Only
+            supported for crops sown with combos, see
+            :func:`~xyzpy.combo_runner_to_ds`.
 
         Returns
         -------
@@ -627,8 +884,18 @@ class Crop(object):
             constants = _parse_constants(constants)
             attrs = _parse_attrs(attrs)
 
+        if stream_to is not None:
+            if settings['combos'] is None:
+                raise ValueError("Only crops sown with combos can be reaped "
+                                 "with `stream_to`.")
+            # n.b. the results are reaped strictly in order, so can't resume
+            if os.path.exists(stream_to):
+                raise ValueError("Can't stream results into {} as it "
+                                 "already exists.".format(stream_to))
+
         with Reaper(self, num_batches=settings['num_batches'],
-                    wait=wait, default_result=default_result) as reap_fn:
+                    wait=wait, default_result=default_result,
+                    num_threads=num_threads) as reap_fn:
 
             # Move constants into attrs, so as not to pass them to the Reaper
             #   when if fact they were meant for the original function.
@@ -645,6 +912,7 @@ class Crop(object):
             if settings['combos'] is not None:
                 opts['combos'] = settings['combos']
                 opts['attrs'] = {**attrs, **constants}
+                opts['stream_to'] = stream_to
                 data = combo_runner_to_ds(**opts)
             else:
                 opts['fn_args'] = settings['fn_args']
@@ -657,8 +925,8 @@ class Crop(object):
 
         return data
 
-    def reap_runner(self, runner, wait=False,
-                    clean_up=None, allow_incomplete=False):
+    def reap_runner(self, runner, wait=False, clean_up=None,
+                    allow_incomplete=False, num_threads=None, stream_to=None):
         """Reap a Crop over sowed combos and save to a dataset defined by a
         Runner.
         """
@@ -673,12 +941,15 @@ class Crop(object):
             parse=False,
             wait=wait,
             clean_up=clean_up,
-            allow_incomplete=allow_incomplete)
+            allow_incomplete=allow_incomplete,
+            num_threads=num_threads,
+            stream_to=stream_to)
         runner.last_ds = ds
         return ds
 
     def reap_harvest(self, harvester, wait=False, sync=True, overwrite=None,
-                     clean_up=None, allow_incomplete=False):
+                     clean_up=None, allow_incomplete=False, num_threads=None,
+                     stream_to=None):
         """Reap a Crop over sowed combos and merge with the dataset defined by
         a Harvester.
         """
@@ -686,7 +957,8 @@ class Crop(object):
             raise ValueError("Cannot reap and harvest if no Harvester is set.")
 
         ds = self.reap_runner(harvester.runner, wait=wait, clean_up=clean_up,
-                              allow_incomplete=allow_incomplete)
+                              allow_incomplete=allow_incomplete,
+                              num_threads=num_threads, stream_to=stream_to)
 
         if sync:
             harvester.add_ds(ds, sync=sync, overwrite=overwrite)
@@ -694,12 +966,13 @@ class Crop(object):
         return ds
 
     def reap_samples(self, sampler, wait=False, sync=True,
-                     clean_up=None, allow_incomplete=False):
+                     clean_up=None, allow_incomplete=False, num_threads=None):
         if sampler is None:
             raise ValueError("Cannot reap samples without a 'Sampler'.")
 
         df = self.reap_runner(sampler.runner, wait=wait, clean_up=clean_up,
-                              allow_incomplete=allow_incomplete)
+                              allow_incomplete=allow_incomplete,
+                              num_threads=num_threads)
 
         if sync:
             sampler._last_df = df
@@ -708,7 +981,8 @@ class Crop(object):
         return df
 
     def reap(self, wait=False, sync=True, overwrite=None,
-             clean_up=None, allow_incomplete=False):
+             clean_up=None, allow_incomplete=False, num_threads=None,
+             stream_to=None):
         """Reap sown and grown combos from disk. Return a dataset if a runner
         or harvester is set, otherwise, the raw nested tuple.
 
@@ -732,27 +1006,145 @@ class Crop(object):
         allow_incomplete : bool, optional
             Allow only partially completed crop results to be reaped,
             incomplete results will all be filled-in as nan.
+        num_threads : int, optional
+            If given, load this many result files at once using a pool of
+            threads, a bounded number of files ahead of where they are
+            needed.
+        stream_to : str, optional
+            If given, and a runner or harvester is set, the path of a new
+            zarr store to write the results into as they are loaded, rather
+            than holding them all in memory.
 
         Returns
         -------
         nested tuple or xarray.Dataset
         """
         opts = dict(clean_up=clean_up, wait=wait,
-                    allow_incomplete=allow_incomplete)
+                    allow_incomplete=allow_incomplete,
+                    num_threads=num_threads)
 
         if isinstance(self.farmer, Runner):
-            return self.reap_runner(self.farmer, **opts)
+            return self.reap_runner(self.farmer, stream_to=stream_to, **opts)
 
         if isinstance(self.farmer, Harvester):
             opts['overwrite'] = overwrite
-            return self.reap_harvest(self.farmer, **opts)
+            return self.reap_harvest(self.farmer, stream_to=stream_to, **opts)
+
+        if stream_to is not None:
+            raise ValueError("Streaming the reaped results requires a Runner "
+                             "or Harvester to be set.")
 
         if isinstance(self.farmer, Sampler):
             return self.reap_samples(self.farmer, **opts)
 
         return self.reap_combos(**opts)
 
-    def check_bad(self, delete_bad=True):
+    def reap_incremental(self, sync=True, overwrite=None, clean_up=False,
+                         num_threads=None):
+        """Reap only the results which have been grown since this crop was
+        last incrementally reaped, merging them into the data of its runner
+        (``Runner.last_ds``), harvester (``Harvester.full_ds``) or sampler
+        (``Sampler.full_df``). Which batches have been merged is recorded in
+        the crop's progress index, so that monitoring a long running crop
+        only ever loads each result once. If the merged data is not synced to
+        disk, e.g. ``sync=False`` or for a runner, this is only recorded on
+        this crop object instead.
+
+        Parameters
+        ----------
+        sync : bool, optional
+            Immediately sync the new data with the on-disk full dataset or
+            dataframe if a harvester or sampler is used.
+        overwrite : bool, optional
+            How to compare data when merging into the runner or harvester's
+            dataset, see :meth:`~xyzpy.Harvester.add_ds`.
+        clean_up : bool, optional
+            Whether to delete the crop once every batch has been merged.
+        num_threads : int, optional
+            If given, load this many result files at once using a pool of
+            threads.
+
+        Returns
+        -------
+        xarray.Dataset, pandas.DataFrame or None
+            Just the newly reaped data, or None if there was none.
+        """
+        if not isinstance(self.farmer, (Runner, Harvester, Sampler)):
+            raise ValueError("Incrementally reaping requires a Runner, "
+                             "Harvester or Sampler to merge the results into.")
+
+        self._progress_time = -math.inf
+        self.calc_progress()
+        if self._progress is None:
+            raise XYZError("This crop has no progress index (perhaps it was "
+                           "sown by an older version) to track which results "
+                           "have been reaped, use ``reap`` instead.")
+
+        new_batches = tuple(b for b in (
+            int(i) + 1 for i in np.flatnonzero(self._progress == _GROWN)
+        ) if b not in self._merged_in_memory)
+
+        if new_batches:
+            settings = self.load_info()
+            if settings['combos'] is not None:
+                fn_args = tuple(name for name, _ in settings['combos'])
+            else:
+                fn_args = settings['fn_args']
+
+            cases = tuple(tuple(kws[arg] for arg in fn_args)
+                          for b in new_batches
+                          for kws in _load_batch(self.location, b))
+
+            runner = getattr(self.farmer, 'runner', self.farmer)
+            with Reaper(self, num_batches=self.num_batches,
+                        batch_numbers=new_batches,
+                        num_threads=num_threads) as reap_fn:
+
+                data = case_runner_to_ds(
+                    fn=reap_fn,
+                    fn_args=fn_args,
+                    cases=cases,
+                    var_names=runner._var_names,
+                    var_dims=runner._var_dims,
+                    var_coords=runner._var_coords,
+                    constants={},
+                    resources={},
+                    attrs={**runner._attrs, **runner._constants},
+                    parse=False,
+                    to_df=isinstance(self.farmer, Sampler))
+
+            if isinstance(self.farmer, Harvester):
+                self.farmer.add_ds(data, sync=sync, overwrite=overwrite)
+            elif isinstance(self.farmer, Sampler):
+                self.farmer.add_df(data, sync=sync)
+            elif getattr(self.farmer, 'last_ds', None) is None:
+                self.farmer.last_ds = data
+            else:
+                self.farmer.last_ds = _merge_datasets(
+                    self.farmer.last_ds, data, overwrite)
+
+            # only record the merge on disk if it has been saved too
+            persisted = (sync and isinstance(self.farmer, (Harvester, Sampler))
+                         and self.farmer.data_name is not None)
+            for b in new_batches:
+                if persisted:
+                    _mark_progress(self.location, b, _MERGED)
+                else:
+                    self._merged_in_memory.add(b)
+            self._progress_time = -math.inf
+        else:
+            data = None
+
+        if clean_up:
+            self.calc_progress()
+            merged = self._progress == _MERGED
+            merged[[b - 1 for b in self._merged_in_memory]] = True
+            if self._num_sown_batches == self.num_batches and np.all(merged):
+                self.delete_all()
+
+        return data
+
+    def check_bad(self, delete_bad=True, thorough=False):
         """Check that the result dumps are not bad -> sometimes length does not
         match the batch. Optionally delete these so that they can be re-grown.
 
@@ -760,6 +1152,10 @@ class Crop(object):
         ----------
         delete_bad : bool
             Delete bad results as they are come across.
+        thorough : bool, optional
+            If False (the default), since results are written atomically,
+            only cheaply check that each file is not truncated. If True,
+            load every result and check it matches the length of its batch.
 
         Returns
         -------
@@ -773,20 +1169,25 @@ class Crop(object):
         bad_ids = []
 
         for result_file in result_files:
-            # load corresponding batch file to check length.
             result_num = os.path.split(
                 result_file)[-1].strip("xyz-result-").strip(".jbdmp")
-            batch_file = os.path.join(
-                self.location, "batches", BTCH_NM.format(result_num))
 
-            batch = joblib.load(batch_file)
+            if not thorough:
+                unloadable = _is_truncated(result_file)
+                err = "file is truncated"
+                if not unloadable:
+                    continue
+
+            else:
+                # load corresponding batch to check length.
+                batch = _load_batch(self.location, result_num)
 
-            try:
-                result = joblib.load(result_file)
-                unloadable = False
-            except Exception as e:
-                unloadable = True
-                err = e
+                try:
+                    result = joblib.load(result_file)
+                    unloadable = False
+                except Exception as e:
+                    unloadable = True
+                    err = e
 
             if unloadable or (len(result) != len(batch)):
                 msg = "result {} is bad".format(result_file)
@@ -796,6 +1197,7 @@ class Crop(object):
 
                 if delete_bad:
                     os.remove(result_file)
+                    _mark_progress(self.location, result_num, _SOWN)
 
                 bad_ids.append(result_num)
 
@@ -878,18 +1280,69 @@ class Sower(object):
         self._batch_cases = []  # collects cases to be written in single batch
         self._counter = 0  # counts how many cases are in batch so far
         self._batch_counter = 0  # counts how many batches have been written
+        self._files = None  # the open packed batches, index & progress files
+
+    def _open_files(self):
+        batches_dir = os.path.join(self.crop.location, "batches")
+        self._files = {}
+
+        if self.crop.packed:
+            self._files['pack'] = open(os.path.join(batches_dir, PACK_NM),
+                                       'wb')
+            self._files['index'] = open(os.path.join(batches_dir, PIDX_NM),
+                                        'wb')
+            self._offset = 0
+
+        # unbuffered, since batches may be grown (and marked) concurrently
+        with contextlib.suppress(FileNotFoundError):
+            self._files['progress'] = open(
+                os.path.join(self.crop.location, PRGS_NM), 'r+b', buffering=0)
+
+    def _close_files(self):
+        for f in self._files.values():
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        self._files = None
 
     def save_batch(self):
-        """Save the current batch of cases to disk using joblib.dump
-         and start the next batch.
+        """Save the current batch of cases to disk and start the next batch.
         """
-        self._batch_counter += 1
-        joblib.dump(self._batch_cases, os.path.join(
-            self.crop.location, "batches", BTCH_NM.format(self._batch_counter))
-        )
+        self.save_record(self._batch_cases, ncases=len(self._batch_cases))
         self._batch_cases = []
         self._counter = 0
 
+    def save_record(self, record, ncases):
+        """Save a single batch, either a list of kwargs or a compactly encoded
+        record of ``ncases`` cases, to disk using joblib.dump, or append it to
+        the packed batches file.
+        """
+        if self._files is None:
+            self._open_files()
+
+        self._batch_counter += 1
+
+        if self.crop.packed:
+            data = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+            self._files['pack'].write(data)
+            self._files['pack'].flush()
+            # only index the batch once it has been completely written
+            entry = (self._offset, len(data), ncases)
+            self._files['index'].write(
+                np.array(entry, dtype=_PIDX_DTYPE).tobytes())
+            self._files['index'].flush()
+            self._offset += len(data)
+        else:
+            batch_file = os.path.join(self.crop.location, "batches",
+                                      BTCH_NM.format(self._batch_counter))
+            # n.b. batches can simply be re-sown, so don't pay to flush each
+            with _atomic_path(batch_file, fsync=False) as tmp_file:
+                joblib.dump(record, tmp_file)
+
+        if 'progress' in self._files:
+            self._files['progress'].seek(self._batch_counter - 1)
+            self._files['progress'].write(bytes((_SOWN,)))
+
     # Context manager #
 
     def __enter__(self):
@@ -907,9 +1360,25 @@ class Sower(object):
             self.save_batch()
 
     def __exit__(self, exception_type, exception_value, traceback):
-        # Make sure any overfill also saved
-        if self._batch_cases:
-            self.save_batch()
+        try:
+            # Make sure any overfill also saved
+            if self._batch_cases:
+                self.save_batch()
+        finally:
+            if self._files is not None:
+                self._close_files()
+
+
+def _is_truncated(file_name):
+    """Cheaply check whether the (uncompressed) joblib dump ``file_name`` is
+    incomplete, i.e. is empty or doesn't end with the pickle 'STOP' opcode.
+    """
+    with open(file_name, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b'.'
 
 
 def grow(batch_number, crop=None, fn=None, check_mpi=True,
@@ -957,8 +1426,7 @@ def grow(batch_number, crop=None, fn=None, check_mpi=True,
             joblib.load(os.path.join(crop_location, FNCT_NM)))
 
     # load cases to evaluate
-    cases = joblib.load(
-        os.path.join(crop_location, "batches", BTCH_NM.format(batch_number)))
+    cases = _load_batch(crop_location, batch_number)
 
     if len(cases) == 0:
         raise ValueError("Something has gone wrong with the loading of "
@@ -992,9 +1460,12 @@ def grow(batch_number, crop=None, fn=None, check_mpi=True,
                              "batch {} ".format(BTCH_NM.format(batch_number)) +
                              "for the crop at {}.".format(crop.location))
 
-        # save to results
-        joblib.dump(tuple(results), os.path.join(
-            crop_location, "results", RSLT_NM.format(batch_number)))
+        # save to results, atomically so result files are always complete
+        result_file = os.path.join(
+            crop_location, "results", RSLT_NM.format(batch_number))
+        with _atomic_path(result_file) as tmp_file:
+            joblib.dump(tuple(results), tmp_file)
+        _mark_progress(crop_location, batch_number, _GROWN)
     else:
         for case in cases:
             # worker: just help compute the result!
@@ -1005,24 +1476,54 @@ def grow(batch_number, crop=None, fn=None, check_mpi=True,
 #                              Gathering results                              #
 # --------------------------------------------------------------------------- #
 
+def _prefetch_map(fn, items, num_threads, window=None):
+    """Like ``map(fn, items)``, but evaluate ``fn`` ahead of time in a pool of
+    ``num_threads`` threads, keeping at most ``window`` (by default twice the
+    number of threads) results pending at once so that memory stays bounded.
+    """
+    if window is None:
+        window = 2 * num_threads
+
+    items = iter(items)
+    with ThreadPoolExecutor(num_threads) as pool:
+        pending = collections.deque(
+            pool.submit(fn, x) for x in itertools.islice(items, window))
+
+        while pending:
+            res = pending.popleft().result()
+            for x in itertools.islice(items, 1):
+                pending.append(pool.submit(fn, x))
+            yield res
+
+
 class Reaper(object):
     """Class that acts as a stateful function to retrieve already sown and
     grow results.
     """
 
-    def __init__(self, crop, num_batches, wait=False, default_result=None):
+    def __init__(self, crop, num_batches, wait=False, default_result=None,
+                 num_threads=None, batch_numbers=None):
         """Class for retrieving the batched, flat, 'grown' results.
 
         Parameters
         ----------
             crop : xyzpy.batch.Crop instance
                 Description of where and how to store the cases and results.
+            num_threads : int, optional
+                If given, load this many result files at once in a pool of
+                threads, ahead of them being needed.
+            batch_numbers : sequence of int, optional
+                Only reap the results of these batches, rather than all
+                ``num_batches`` of them.
         """
         self.crop = crop
 
+        if batch_numbers is None:
+            batch_numbers = range(1, num_batches + 1)
+
         files = (
-            os.path.join(self.crop.location, "results", RSLT_NM.format(i + 1))
-            for i in range(num_batches)
+            os.path.join(self.crop.location, "results", RSLT_NM.format(i))
+            for i in batch_numbers
         )
 
         def _load(x):
@@ -1053,8 +1554,14 @@ class Reaper(object):
             else:
                 raise ValueError("{} is not a file.".format(x))
 
-        self.results = chain.from_iterable(map(
-            wait_to_load if wait else _load, files))
+        load = wait_to_load if wait else _load
+
+        if num_threads:
+            self._loaded = _prefetch_map(load, files, num_threads)
+        else:
+            self._loaded = map(load, files)
+
+        self.results = chain.from_iterable(self._loaded)
 
     def __enter__(self):
         return self
@@ -1063,9 +1570,14 @@ class Reaper(object):
         return next(self.results)
 
     def __exit__(self, exception_type, exception_value, traceback):
-        # Check everything gone acccording to plan
-        if tuple(self.results):
-            raise XYZError("Not all results reaped!")
+        try:
+            # Check everything gone acccording to plan
+            if exception_type is None and tuple(self.results):
+                raise XYZError("Not all results reaped!")
+        finally:
+            if hasattr(self._loaded, 'close'):
+                # stop any further loading ahead
+                self._loaded.close()
 
 
 # --------------------------------------------------------------------------- #
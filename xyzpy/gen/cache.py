@@ -0,0 +1,225 @@
+"""Content addressed caching of individual function evaluations.
+"""
+import collections
+import functools
+import inspect
+import os
+import uuid
+
+import joblib
+from joblib.externals import cloudpickle
+
+
+def _source(obj):
+    try:
+        return inspect.getsource(obj)
+    except (TypeError, OSError):
+        return None
+
+
+# closed over values of these types, e.g. used to record calls, are assumed
+#     not to affect the results, and so only their type is hashed
+_UNHASHED_CLOSURE_TYPES = (list, dict, set, bytearray)
+
+
+def _closure_value(x, seen):
+    if isinstance(x, _UNHASHED_CLOSURE_TYPES):
+        return type(x).__name__
+    if callable(x):
+        return _fingerprint_parts(x, seen)
+    return x
+
+
+def _fingerprint_parts(fn, seen):
+    """Gather the parts identifying ``fn``, replacing any object already in
+    ``seen`` (a mapping of ``id`` to object), such as the owner of a bound
+    method stored on itself, with a placeholder, so that cycles terminate.
+    """
+    if id(fn) in seen:
+        return ('seen', type(fn).__qualname__)
+    seen[id(fn)] = fn
+
+    if isinstance(fn, functools.partial):
+        return ('partial', _fingerprint_parts(fn.func, seen), fn.args,
+                fn.keywords)
+
+    if inspect.isfunction(fn):
+        closure = tuple(_closure_value(cell.cell_contents, seen)
+                        for cell in fn.__closure__ or ())
+        source = _source(fn)
+        if source is None:
+            # e.g. defined interactively, fall back to the actual bytecode
+            source = cloudpickle.dumps(fn)
+        return (fn.__module__, fn.__qualname__, source,
+                fn.__defaults__, fn.__kwdefaults__, closure)
+
+    if inspect.ismethod(fn):
+        return ('method', _fingerprint_parts(fn.__func__, seen),
+                _fingerprint_parts(fn.__self__, seen))
+
+    if hasattr(fn, '__dict__'):
+        # callable object, e.g. a wrapper of another function
+        cls = type(fn)
+        state = {k: _fingerprint_parts(v, seen) if callable(v) else v
+                 for k, v in vars(fn).items()}
+        return (cls.__module__, cls.__qualname__, _source(cls), state)
+
+    return cloudpickle.dumps(fn)
+
+
+def fn_fingerprint(fn):
+    """Compute a hash identifying ``fn`` that is stable across sessions, but
+    changes if its code, defaults, closure or (for callable objects) state
+    changes. Closed over lists, dicts and sets, which are often used just to
+    record calls, are only identified by their type, and module globals are
+    not included at all.
+
+    Parameters
+    ----------
+    fn : callable
+        The function to fingerprint.
+
+    Returns
+    -------
+    str
+    """
+    return joblib.hash(_fingerprint_parts(fn, {}))
+
+
+class ResultCache(object):
+    """A cache of function results, with a least recently used in-memory tier
+    and optionally a size limited on-disk tier. Supply it to a runner, e.g.
+    ``combo_runner(..., cache=cache)`` or ``Runner(..., cache=cache)``, and
+    every evaluation is looked up by a hash of the function's fingerprint
+    (see :func:`~xyzpy.gen.cache.fn_fingerprint`), its constants and its
+    arguments, before anything is submitted.
+
+    Parameters
+    ----------
+    directory : str, optional
+        If given, also store results on disk in this directory, so that they
+        persist between sessions.
+    memory_size : int, optional
+        The maximum number of results to keep in memory.
+    disk_size : int, optional
+        The maximum total size in bytes of results to keep on disk, beyond
+        which the least recently used results are removed. By default there
+        is no limit.
+
+    Examples
+    --------
+
+        >>> import xyzpy as xyz
+        >>> cache = xyz.ResultCache('.xyz-cache', disk_size=2**30)
+        >>> r = xyz.Runner(fn, var_names='x', cache=cache)
+        >>> ds = r.run_combos({'a': range(10)})  # computed
+        >>> ds = r.run_combos({'a': range(20)})  # only computes a >= 10
+
+    """
+
+    def __init__(self, directory=None, memory_size=1024, disk_size=None):
+        self.directory = directory
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self._memory = collections.OrderedDict()
+        self._disk_bytes = None
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.joblib')
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _scan_disk(self):
+        """Find every result on disk, least recently used first, as
+        ``(last_used, nbytes, path)``.
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.joblib'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def _evict(self):
+        """Remove least recently used results until within ``disk_size``.
+        """
+        entries = self._scan_disk()
+        self._disk_bytes = sum(nbytes for _, nbytes, _ in entries)
+
+        for _, nbytes, path in entries:
+            if self._disk_bytes <= self.disk_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._disk_bytes -= nbytes
+
+    def __getitem__(self, key):
+        try:
+            value = self._memory[key]
+            self._memory.move_to_end(key)
+            return value
+        except KeyError:
+            if self.directory is None:
+                raise
+
+        path = self._path(key)
+        try:
+            value = joblib.load(path)
+        except FileNotFoundError:
+            raise KeyError(key)
+
+        # mark as recently used
+        os.utime(path)
+        self._remember(key, value)
+        return value
+
+    def __setitem__(self, key, value):
+        self._remember(key, value)
+
+        if self.directory is None:
+            return
+
+        # write then move, so that a partial file is never read
+        path = self._path(key)
+        tmp_path = "{}.{}.tmp".format(path, uuid.uuid4().hex)
+        joblib.dump(value, tmp_path)
+        os.replace(tmp_path, path)
+
+        if self.disk_size is not None:
+            if self._disk_bytes is None:
+                self._evict()
+            else:
+                self._disk_bytes += os.path.getsize(path)
+                if self._disk_bytes > self.disk_size:
+                    self._evict()
+
+    def __contains__(self, key):
+        return (key in self._memory) or (
+            self.directory is not None and os.path.exists(self._path(key)))
+
+    def __len__(self):
+        if self.directory is None:
+            return len(self._memory)
+        return len(self._scan_disk())
+
+    def clear(self):
+        """Remove every cached result, both in memory and on disk.
+        """
+        self._memory.clear()
+        if self.directory is not None:
+            for _, _, path in self._scan_disk():
+                os.remove(path)
+            self._disk_bytes = 0
+
+    def __repr__(self):
+        return "<xyzpy.ResultCache(directory={}, size={})>".format(
+            self.directory, len(self))
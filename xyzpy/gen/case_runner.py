@@ -5,10 +5,11 @@ import functools
 import itertools
 
 import numpy as np
+import pandas as pd
 import xarray as xr
 from cytoolz import concat
 
-from ..utils import progbar, _choose_executor_depr_pool
+from ..utils import _choose_executor_depr_pool
 from .prepare import (
     _parse_fn_args,
     _parse_cases,
@@ -21,7 +22,12 @@ from .prepare import (
 )
 
 
-from .combo_runner import _combo_runner
+from .combo_runner import (
+    _combo_runner,
+    _is_coroutine_fn,
+    _add_profiling,
+    _add_repeats,
+)
 
 
 class SingleArgFn:
@@ -33,32 +39,73 @@ class SingleArgFn:
         return self.fn(**kws, **kwargs)
 
 
+class AsyncSingleArgFn(SingleArgFn):
+
+    async def __call__(self, kws, **kwargs):
+        return await self.fn(**kws, **kwargs)
+
+
+def _case_costs(cost, cases_kws):
+    """Estimate the cost of each case, given as a dict of keyword arguments.
+    See :func:`~xyzpy.case_runner`.
+    """
+    if callable(cost):
+        return [cost(**kws) for kws in cases_kws]
+
+    if isinstance(cost, xr.DataArray):
+        # look up every case at once, with any not found as missing
+        ixs = tuple(cost.indexes[dim].get_indexer([kws[dim] for kws in
+                                                   cases_kws])
+                    for dim in cost.dims)
+        found = np.logical_and.reduce([ix >= 0 for ix in ixs])
+        costs = np.full(len(cases_kws), np.nan)
+        costs[found] = cost.values[tuple(ix[found] for ix in ixs)]
+        return costs
+
+    return cost
+
+
 def _case_runner(fn, fn_args, cases, constants,
                  split=False,
                  parallel=False,
                  num_workers=None,
                  executor=None,
                  verbosity=1,
-                 pool=None):
+                 pool=None,
+                 chunksize=None,
+                 share_arrays=False,
+                 preload_fn=False,
+                 cost=None,
+                 cache=None,
+                 repeats=None):
     """Core case runner, i.e. without parsing of arguments.
     """
     executor = _choose_executor_depr_pool(executor, pool)
 
     # Turn the function into a single arg function to send to combo_runner
-    sfn = SingleArgFn(fn)
+    sfn = (AsyncSingleArgFn if _is_coroutine_fn(fn) else SingleArgFn)(fn)
 
     if isinstance(cases[0], dict):
         combos = (('kws', cases),)
     else:
         combos = (('kws', [dict(zip(fn_args, case)) for case in cases]),)
 
+    if cost is not None:
+        cost = _case_costs(cost, combos[0][1])
+
     return _combo_runner(sfn, combos,
                          constants=constants,
                          split=split,
                          parallel=parallel,
                          num_workers=num_workers,
                          executor=executor,
-                         verbosity=verbosity)
+                         verbosity=verbosity,
+                         chunksize=chunksize,
+                         share_arrays=share_arrays,
+                         preload_fn=preload_fn,
+                         cost=cost,
+                         cache=cache,
+                         repeats=repeats)
 
 
 def case_runner(fn, fn_args, cases,
@@ -68,7 +115,12 @@ def case_runner(fn, fn_args, cases,
                 executor=None,
                 num_workers=None,
                 verbosity=1,
-                pool=None):
+                pool=None,
+                chunksize=None,
+                share_arrays=False,
+                preload_fn=False,
+                cost=None,
+                cache=None):
     """Evaluate a function in many different configurations, optionally in
     parallel and or with live progress.
 
@@ -92,6 +144,21 @@ def case_runner(fn, fn_args, cases,
         See :func:`~xyzpy.combo_runner`.
     verbosity : {0, 1, 2}, optional
         See :func:`~xyzpy.combo_runner`.
+    chunksize : int or 'auto', optional
+        See :func:`~xyzpy.combo_runner`.
+    share_arrays : bool, optional
+        See :func:`~xyzpy.combo_runner`.
+    preload_fn : bool, optional
+        See :func:`~xyzpy.combo_runner`.
+    cost : callable, xarray.DataArray or sequence, optional
+        An estimate of how expensive each case is, so that the most expensive
+        can be submitted first. Either a function called with the keyword
+        arguments of each case, a DataArray labelled by the case arguments -
+        such as the timings from a previous run - or a sequence with a cost
+        for each case. Unknown (``nan``) costs are assumed to be the most
+        expensive.
+    cache : ResultCache, optional
+        See :func:`~xyzpy.combo_runner`.
 
     Returns
     -------
@@ -110,7 +177,12 @@ def case_runner(fn, fn_args, cases,
                         parallel=parallel,
                         num_workers=num_workers,
                         executor=executor,
-                        verbosity=verbosity)
+                        verbosity=verbosity,
+                        chunksize=chunksize,
+                        share_arrays=share_arrays,
+                        preload_fn=preload_fn,
+                        cost=cost,
+                        cache=cache)
 
 
 def find_union_coords(cases):
@@ -161,8 +233,6 @@ def _cases_to_df(results, fn_args, cases, var_names, var_dims=None,
                  var_coords=None, constants=None, attrs=None):
     """Turn cases and results into a ``pandas.DataFrame``.
     """
-    import pandas as pd
-
     if var_names is None:
         raise ValueError("Can't coerce dataset output into dataframe.")
     if var_dims is not None and any(var_dims.values()):
@@ -186,6 +256,90 @@ def _cases_to_df(results, fn_args, cases, var_names, var_dims=None,
     return df
 
 
+def _scatter_cases(ds, results, fn_args, cases, var_names, overwrite=False):
+    """Try to insert all ``results`` into ``ds`` at once, by converting the
+    coordinates of every case into integer indices and then performing a
+    single fancy-indexed assignment on the underlying numpy array of each
+    variable.
+
+    Returns
+    -------
+    bool
+        Whether the fast path was possible, if ``False`` then ``ds`` has not
+        been modified and the results should be inserted case by case.
+    """
+    ncases = len(cases)
+    columns = tuple(zip(*cases))
+
+    # convert the coordinates of each case into integer positions
+    try:
+        indexers = tuple(
+            ds.indexes[arg].get_indexer(list(column))
+            for arg, column in zip(fn_args, columns)
+        )
+    except Exception:
+        # missing or non-unique index etc.
+        return False
+
+    if any((ix < 0).any() for ix in indexers):
+        # case not in dataset coordinates -> let xarray raise the error
+        return False
+
+    if not overwrite:
+        shape = tuple(ds.dims[arg] for arg in fn_args)
+        flat_ix = np.ravel_multi_index(indexers, shape)
+        if np.unique(flat_ix).size != ncases:
+            raise ValueError("Duplicate cases found and `overwrite` = False.")
+
+    # work out the targets and values for every variable before writing any
+    targets = []
+    for j, vname in enumerate(var_names):
+        var = ds.variables[vname]
+        data = var.data
+
+        if not (isinstance(data, np.ndarray) and data.flags.writeable):
+            # e.g. dask or lazily loaded -> no direct access
+            return False
+        if any(arg not in var.dims for arg in fn_args):
+            return False
+
+        # view of data with the case dimensions first
+        axes = ([var.dims.index(arg) for arg in fn_args] +
+                [i for i, d in enumerate(var.dims) if d not in fn_args])
+        view = np.transpose(data, axes)
+        target_shape = (ncases,) + view.shape[len(fn_args):]
+
+        try:
+            values = np.asarray([res[j] for res in results])
+            # align each result with the trailing internal dimensions, as
+            #     assigning a single case at a time would
+            npad = len(target_shape) - values.ndim
+            if npad < 0:
+                return False
+            values = values.reshape(
+                (ncases,) + (1,) * npad + values.shape[1:])
+            values = np.broadcast_to(values, target_shape)
+        except ValueError:
+            # ragged or mis-shaped results
+            return False
+
+        if not overwrite:
+            existing = view[indexers].reshape(ncases, -1)
+            notnull = ~pd.isnull(existing).all(axis=1)
+            if notnull.any():
+                loc = dict(zip(fn_args, cases[int(np.argmax(notnull))]))
+                raise ValueError(
+                    "Existing data for variable {} at position {} and "
+                    "`overwrite` = False.".format(vname, loc))
+
+        targets.append((view, values))
+
+    for view, values in targets:
+        view[indexers] = values
+
+    return True
+
+
 def _cases_to_ds(results, fn_args, cases, var_names, add_to_ds=None,
                  var_dims=None, var_coords=None, constants=None, attrs=None,
                  overwrite=False):
@@ -248,7 +402,11 @@ def _cases_to_ds(results, fn_args, cases, var_names, add_to_ds=None,
             newattrs = {k: v for k, v in constants.items() if k not in ds.dims}
             ds.attrs.update(newattrs)
 
-    # Go through cases, overwriting nan with results
+    # Try and insert all results at once
+    if _scatter_cases(ds, results, fn_args, cases, var_names, overwrite):
+        return ds
+
+    # Else go through cases, overwriting nan with results
     for res, cfg in zip(results, cases):
 
         cfg = [[c] for c in cfg]
@@ -281,6 +439,11 @@ def case_runner_to_ds(fn, fn_args, cases, var_names,
                       overwrite=False,
                       parse=True,
                       to_df=False,
+                      profile=False,
+                      repeats=None,
+                      rtol=0.02,
+                      atol=None,
+                      min_repeats=5,
                       **case_runner_settings):
     """ Combination of `case_runner` and `_cases_to_ds`. Takes a function and
     list of argument configurations and produces a `xarray.Dataset`.
@@ -301,6 +464,18 @@ def case_runner_to_ds(fn, fn_args, cases, var_names,
     overwrite : bool, optional
     parse : bool, optional
     to_df : bool, optional
+    profile : bool, optional
+        Also record the time taken etc. for each case, see
+        :func:`~xyzpy.combo_runner_to_ds`.
+    repeats : int, optional
+        Repeat each case until the mean of its outputs converges, see
+        :func:`~xyzpy.combo_runner_to_ds`.
+    rtol : float, optional
+        The relative tolerance on the error of the mean, if repeating.
+    atol : float, optional
+        The absolute tolerance on the error of the mean, if repeating.
+    min_repeats : int, optional
+        If repeating, the minimum number of times to evaluate each case.
 
     Returns
     -------
@@ -317,6 +492,14 @@ def case_runner_to_ds(fn, fn_args, cases, var_names,
         var_dims = _parse_var_dims(var_dims, var_names)
         var_coords = _parse_var_coords(var_coords)
 
+    if profile:
+        fn, var_names, var_dims = _add_profiling(fn, var_names, var_dims)
+
+    if repeats is not None:
+        case_runner_settings['repeats'], var_names, var_dims = _add_repeats(
+            var_names, var_dims, repeats, rtol=rtol, atol=atol,
+            min_repeats=min_repeats, profiled=profile)
+
     # Generate results
     results = _case_runner(fn, fn_args, cases,
                            constants={**constants, **resources},
@@ -350,17 +533,37 @@ case_runner_to_df = functools.partial(case_runner_to_ds, to_df=True)
 # Update or add new values                                                    #
 # --------------------------------------------------------------------------- #
 
+def _missing_mask(ds, fn_args):
+    """Compute a boolean array, with dimensions ``fn_args`` in that order,
+    marking which cases of ``ds`` have all their variables entirely null.
+    """
+    # A case is missing if all variables are entirely null for it
+    missing = xr.DataArray(True)
+    for v in ds.data_vars:
+        isnull = ds[v].isnull()
+        internal_dims = [d for d in isnull.dims if d not in fn_args]
+        if internal_dims:
+            isnull = isnull.all(internal_dims)
+        missing = missing & isnull
+
+    # make sure mask has every dimension, then compute it (if dask)
+    missing = missing.expand_dims({arg: ds.dims[arg] for arg in fn_args
+                                   if arg not in missing.dims})
+    return np.asarray(missing.transpose(*fn_args).values)
+
+
 def find_missing_cases(ds, ignore_dims=None, show_progbar=False):
     """Find all cases in a dataset with missing data.
 
     Parameters
     ----------
     ds : xarray.Dataset
-        Dataset in which to find missing data
+        Dataset in which to find missing data, can be backed by dask arrays.
     ignore_dims : set (optional)
         internal variable dimensions (i.e. to ignore)
     show_progbar : bool (optional)
-        Show the current progress
+        Ignored, kept for backwards compatibility - the missing cases are
+        now found with a single vectorized reduction.
 
     Returns
     -------
@@ -373,17 +576,15 @@ def find_missing_cases(ds, ignore_dims=None, show_progbar=False):
 
     # Find all configurations
     fn_args = tuple(coo for coo in ds.dims if coo not in ignore_dims)
-    var_names = tuple(ds.data_vars)
-    all_cases = itertools.product(*(ds[arg].data for arg in fn_args))
 
-    # Only return those corresponding to all missing data
-    def gen_missing_list():
-        for case in progbar(all_cases, disable=not show_progbar):
-            sub_ds = ds.loc[dict(zip(fn_args, case))]
-            if all(sub_ds[v].isnull().all() for v in var_names):
-                yield case
+    mask = _missing_mask(ds, fn_args)
+
+    if not fn_args:
+        return fn_args, ((),) if mask else ()
 
-    return fn_args, tuple(gen_missing_list())
+    # map the indices of all missing cases back to coordinate values
+    coords = (ds[arg].values[ix] for arg, ix in zip(fn_args, np.nonzero(mask)))
+    return fn_args, tuple(zip(*coords))
 
 
 def fill_missing_cases(ds, fn, var_names,
@@ -1,15 +1,25 @@
 """Functions for systematically evaluating a function over all combinations.
 """
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
 import functools
+import hashlib
+import inspect
+import itertools
 import multiprocessing
+import os
+import sys
+import time
 
+import joblib
 import numpy as np
 import xarray as xr
-from joblib.externals import loky
+from joblib.externals import cloudpickle, loky
 
 from ..utils import (
     unzip,
-    flatten,
     prod,
     progbar,
     _choose_executor_depr_pool,
@@ -23,6 +33,8 @@ from .prepare import (
     _parse_combos,
     _parse_combo_results,
 )
+from .shared import shared_arrays
+from .cache import fn_fingerprint
 
 
 def _submit(executor, fn, *args, **kwds):
@@ -60,42 +72,6 @@ def _submit(executor, fn, *args, **kwds):
                         " or ``apply_async`` method.".format(executor))
 
 
-def nested_submit(fn, combos, kwds, executor=None):
-    """Recursively submit jobs directly to an executor pool.
-
-    Parameters
-    ----------
-    fn : callable
-        Function to submit jobs to.
-    combos : tuple mapping individual fn arguments to sequence of values
-        Mapping of each argument and all its possible values.
-    kwds : dict
-        Constant keyword arguments not to iterate over.
-    executor : Executor pool
-         The pool executor used to compute the results.
-
-    Returns
-    -------
-    results : nested tuple
-        Nested tuples of results.
-    """
-    arg, inputs = combos[0]
-
-    # have reached most nested level?
-    if len(combos) == 1:
-        if executor is not None:
-            return tuple(_submit(executor, fn, **kwds, **{arg: x})
-                         for x in inputs)
-
-        return tuple(fn(**kwds, **{arg: x}) for x in inputs)
-
-    # else recurse through current level
-    return tuple(
-        nested_submit(fn, combos[1:], {**kwds, arg: x}, executor=executor)
-        for x in inputs
-    )
-
-
 def default_getter(pbar=None):
     """Generate the default function to get a result from a future, updating
     the progress bar ``pbar`` in the process.
@@ -118,32 +94,285 @@ def default_getter(pbar=None):
     return getter
 
 
-def nested_get(futures, ndim, getter):
-    """Recusively get results from nested futures.
+def unflatten(its, shape):
+    """Take the flat iterable ``its`` and nest it into tuples with ``shape``,
+    i.e. the inverse of :func:`~xyzpy.utils.flatten`.
+
+    Examples
+    --------
+
+        >>> unflatten(range(6), (2, 3))
+        ((0, 1, 2), (3, 4, 5))
+
+    """
+    its = iter(its)
+
+    def _unflatten(shape):
+        if len(shape) == 1:
+            return tuple(itertools.islice(its, shape[0]))
+        return tuple(_unflatten(shape[1:]) for _ in range(shape[0]))
+
+    return _unflatten(shape)
+
+
+def _gen_combo_kwargs(combos, indices=None):
+    """Generate the flat index and keyword arguments of every combination in
+    ``combos``, in row-major (C) order, or else just those at the flat
+    positions ``indices``, in that order.
+    """
+    args = tuple(arg for arg, _ in combos)
+
+    if indices is None:
+        all_vals = itertools.product(*(inputs for _, inputs in combos))
+        for i, vals in enumerate(all_vals):
+            yield i, dict(zip(args, vals))
+        return
+
+    shape = tuple(len(inputs) for _, inputs in combos)
+    for i in indices:
+        ix = np.unravel_index(i, shape)
+        yield int(i), {arg: inputs[j] for (arg, inputs), j in zip(combos, ix)}
+
+
+def collect_nested(results, shape):
+    """Collect ``(index, result)`` pairs, where ``index`` is the flat position
+    of each result, into a nested tuple with ``shape``.
     """
-    return (tuple(getter(fut) for fut in futures) if ndim == 1 else
-            tuple(nested_get(fut, ndim - 1, getter) for fut in futures))
+    flat = [None] * prod(shape)
+    for i, res in results:
+        flat[i] = res
+    return unflatten(flat, shape)
+
+
+def collect_arrays(results, shape, num_vars=1):
+    """Collect ``(index, result)`` pairs, where ``index`` is the flat position
+    of each result, directly into one preallocated array per output variable.
+    The dtype and shape of each variable is inferred from the first result,
+    and only upcast if a later result requires it.
+
+    Parameters
+    ----------
+    results : iterable of (int, result)
+        The flat index and output of each function evaluation.
+    shape : tuple of int
+        The shape of the combos.
+    num_vars : int, optional
+        How many outputs each result consists of.
+
+    Returns
+    -------
+    numpy.ndarray or tuple of numpy.ndarray
+        Array(s) of shape ``shape + var_shape``, a single array if
+        ``num_vars == 1``.
+    """
+    n = prod(shape)
+    flat_arrays = None
+
+    for i, res in results:
+        if num_vars == 1:
+            res = (res,)
+
+        xs = tuple(map(np.asarray, res))
+
+        if flat_arrays is None:
+            flat_arrays = [np.empty((n, *x.shape), dtype=x.dtype) for x in xs]
 
+        for j, x in enumerate(xs):
+            if x.dtype != flat_arrays[j].dtype:
+                dtype = np.result_type(flat_arrays[j], x)
+                if dtype != flat_arrays[j].dtype:
+                    flat_arrays[j] = flat_arrays[j].astype(dtype)
+            flat_arrays[j][i] = x
 
-def _combo_runner_executor(fn, combos, constants, n,
-                           ndim, executor, verbosity=1):
+    if flat_arrays is None:
+        # no results at all
+        flat_arrays = [np.empty((0,))] * num_vars
+
+    arrays = tuple(x.reshape(shape + x.shape[1:]) for x in flat_arrays)
+    return arrays[0] if num_vars == 1 else arrays
+
+
+def _evaluate_chunk(fn, chunk, **kwds):
+    """Sequentially evaluate ``fn`` for each set of arguments in ``chunk``,
+    this is the function actually run by workers when chunking.
+    """
+    return tuple(fn(**kwds, **kws) for kws in chunk)
+
+
+def _choose_chunksize(chunksize, n, num_workers):
+    """Work out how many combos to group into a single task. ``'auto'`` aims
+    for roughly four tasks per worker, like ``multiprocessing.Pool.map``.
+    """
+    if chunksize == 'auto':
+        if not num_workers:
+            num_workers = multiprocessing.cpu_count()
+        chunksize, extra = divmod(n, 4 * num_workers)
+        return max(1, chunksize + int(extra > 0))
+
+    if not isinstance(chunksize, int):
+        raise TypeError("`chunksize` must be an integer or 'auto'.")
+    if chunksize < 1:
+        raise ValueError("`chunksize` must be >= 1.")
+
+    return chunksize
+
+
+def chunked_submit(fn, tasks, kwds, executor, chunksize):
+    """Submit contiguous chunks of tasks to an executor pool, such that each
+    submission evaluates ``chunksize`` combinations in a worker-side loop.
+    The chunks are only submitted as this generator is advanced.
+
+    Parameters
+    ----------
+    fn : callable
+        Function to submit jobs to.
+    tasks : iterable of (int, dict)
+        The flat index and keyword arguments of each combination.
+    kwds : dict
+        Constant keyword arguments not to iterate over.
+    executor : Executor pool
+         The pool executor used to compute the results.
+    chunksize : int
+        How many combos to evaluate per task.
+
+    Yields
+    ------
+    future, tuple of int
+        Each future and the flat indices of the combos it is evaluating.
+    """
+    tasks = iter(tasks)
+
+    while True:
+        chunk = tuple(itertools.islice(tasks, chunksize))
+        if not chunk:
+            return
+        indices, chunk_kws = zip(*chunk)
+        yield (_submit(executor, _evaluate_chunk, fn, chunk_kws, **kwds),
+               indices)
+
+
+def _gen_submit(fn, tasks, kwds, executor):
+    """Submit each task to an executor pool, only as this generator is
+    advanced, yielding each future and the flat index of its combo.
+    """
+    for i, kws in tasks:
+        yield _submit(executor, fn, **kwds, **kws), i
+
+
+# how many tasks per worker to keep submitted at once
+_TASKS_IN_FLIGHT_PER_WORKER = 2
+
+
+def _max_in_flight(executor):
+    """How many tasks to keep submitted to ``executor`` at once - enough to
+    keep every worker busy without holding every result at once.
+    """
+    num_workers = (getattr(executor, '_max_workers', None) or
+                   getattr(executor, '_processes', None) or
+                   multiprocessing.cpu_count())
+    return _TASKS_IN_FLIGHT_PER_WORKER * num_workers
+
+
+def _gen_results(submissions, max_in_flight, chunked=False, pbar=None):
+    """Generate ``(index, result)`` pairs from an iterator of lazily submitted
+    ``(future, index)`` pairs, keeping only ``max_in_flight`` submitted at
+    once and submitting another as each completes. If the futures are
+    ``concurrent.futures`` compatible, they are yielded as they complete,
+    else in order. Each future is dropped once its result has been yielded,
+    so that only around ``max_in_flight`` results are ever held at once.
+    """
+    getter = default_getter()
+    submissions = iter(submissions)
+    pending = collections.OrderedDict(
+        itertools.islice(submissions, max_in_flight))
+
+    as_completed = all(isinstance(f, concurrent.futures.Future)
+                       for f in pending)
+
+    while pending:
+        if as_completed:
+            done, _ = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        else:
+            done = (next(iter(pending)),)
+
+        for future in done:
+            ix = pending.pop(future)
+            # keep the workers busy while this result is consumed
+            pending.update(itertools.islice(submissions, 1))
+            res = getter(future)
+            del future
+            if chunked:
+                yield from zip(ix, res)
+                size = len(ix)
+            else:
+                yield ix, res
+                size = 1
+            del res
+            if pbar:
+                pbar.update(size)
+        del done
+
+
+def _combo_runner_executor(fn, tasks, constants, n, executor, collect,
+                           verbosity=1, chunksize=None):
     """Submit and retrieve combos from a generic pool-executor.
     """
+    max_in_flight = _max_in_flight(executor)
+
     with progbar(total=n, disable=verbosity <= 0) as pbar:
 
         if verbosity >= 2:
             pbar.set_description("Processing with pool")
 
-        futures = nested_submit(fn, combos, constants, executor=executor)
-        getter = default_getter(pbar)
-        return nested_get(futures, ndim, getter)
+        if chunksize is not None:
+            num_workers = getattr(executor, '_max_workers', None)
+            chunksize = _choose_chunksize(chunksize, n, num_workers)
+            submissions = chunked_submit(fn, tasks, constants, executor,
+                                         chunksize)
+            return collect(_gen_results(submissions, max_in_flight,
+                                        chunked=True, pbar=pbar))
 
+        submissions = _gen_submit(fn, tasks, constants, executor)
+        return collect(_gen_results(submissions, max_in_flight, pbar=pbar))
 
-def _combo_runner_parallel(fn, combos, constants, n, ndim,
-                           num_workers, verbosity=1):
+
+# functions sent to this worker process once, by token
+_PRELOADED_FNS = {}
+
+
+def _preload_fn(token, fn_pkl):
+    """Initializer for worker processes, registering ``fn`` under ``token``.
+    """
+    _PRELOADED_FNS[token] = cloudpickle.loads(fn_pkl)
+
+
+class _PreloadedFn:
+    """Stand-in for a function that has already been sent to every worker,
+    such that only its token need be pickled along with each task.
+    """
+
+    def __init__(self, token):
+        self.token = token
+
+    def __call__(self, *args, **kwargs):
+        return _PRELOADED_FNS[self.token](*args, **kwargs)
+
+
+def _combo_runner_parallel(fn, tasks, constants, n, num_workers, collect,
+                           verbosity=1, chunksize=None, preload_fn=False):
     """Submit and retrieve combos from a ProcessPoolExecutor.
     """
-    executor = loky.get_reusable_executor(num_workers)
+    if preload_fn:
+        # the same function will reuse the same workers
+        fn_pkl = cloudpickle.dumps(fn)
+        token = hashlib.sha1(fn_pkl).hexdigest()
+        executor = loky.get_reusable_executor(num_workers,
+                                              initializer=_preload_fn,
+                                              initargs=(token, fn_pkl))
+        fn = _PreloadedFn(token)
+    else:
+        executor = loky.get_reusable_executor(num_workers)
 
     with progbar(total=n, disable=verbosity <= 0) as pbar:
 
@@ -151,10 +380,110 @@ def _combo_runner_parallel(fn, combos, constants, n, ndim,
             desc = "Processing with {} workers".format(executor._max_workers)
             pbar.set_description(desc)
 
-        futures = nested_submit(fn, combos, constants, executor=executor)
-        for f in loky.as_completed(flatten(futures, ndim)):
-            pbar.update()
-        return nested_get(futures, ndim, default_getter())
+        max_in_flight = _max_in_flight(executor)
+
+        if chunksize is not None:
+            chunksize = _choose_chunksize(chunksize, n, executor._max_workers)
+            submissions = chunked_submit(fn, tasks, constants, executor,
+                                         chunksize)
+            return collect(_gen_results(submissions, max_in_flight,
+                                        chunked=True, pbar=pbar))
+
+        submissions = _gen_submit(fn, tasks, constants, executor)
+        return collect(_gen_results(submissions, max_in_flight, pbar=pbar))
+
+
+def _is_coroutine_fn(fn):
+    """Check if calling ``fn`` returns a coroutine, including for callable
+    objects with an ``async def __call__`` method.
+    """
+    return (inspect.iscoroutinefunction(fn) or
+            inspect.iscoroutinefunction(getattr(fn, '__call__', None)))
+
+
+def _asyncio_run(coro):
+    """Run ``coro`` on a new event loop, like ``asyncio.run`` (python 3.7+).
+    """
+    if hasattr(asyncio, 'run'):
+        return asyncio.run(coro)
+
+    loop = asyncio.new_event_loop()  # pragma: no cover
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def _loop_is_running():
+    """Check if an event loop is already running in this thread.
+    """
+    if hasattr(asyncio, 'get_running_loop'):
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
+
+    return asyncio.get_event_loop().is_running()  # pragma: no cover
+
+
+def _run_coroutine(coro):
+    """Run ``coro`` to completion on a new event loop, in a separate thread
+    if an event loop is already running in this one (e.g. in a notebook).
+    """
+    if not _loop_is_running():
+        return _asyncio_run(coro)
+
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        return executor.submit(_asyncio_run, coro).result()
+
+
+async def _gather_async(fn, tasks, constants, num_workers, pbar=None):
+    """Evaluate all ``tasks`` with ``num_workers`` coroutines each pulling
+    from the same iterator, such that only that many evaluations are ever in
+    flight at once. Synchronous functions are run in the default executor.
+    """
+    if _is_coroutine_fn(fn):
+        afn = fn
+    else:
+        async def afn(**kwargs):
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(
+                None, functools.partial(fn, **kwargs))
+
+    tasks = iter(tasks)
+    results = []
+
+    async def worker():
+        for i, kws in tasks:
+            results.append((i, await afn(**constants, **kws)))
+            if pbar:
+                pbar.update()
+
+    await asyncio.gather(*(worker() for _ in range(num_workers)))
+    return results
+
+
+_DEFAULT_ASYNCIO_WORKERS = 128
+
+
+def _combo_runner_asyncio(fn, tasks, constants, n, collect, num_workers=None,
+                          verbosity=1):
+    """Run combos concurrently on an asyncio event loop.
+    """
+    if num_workers is None:
+        num_workers = _DEFAULT_ASYNCIO_WORKERS
+
+    with progbar(total=n, disable=verbosity <= 0) as pbar:
+
+        if verbosity >= 2:
+            desc = "Processing with {} coroutines".format(num_workers)
+            pbar.set_description(desc)
+
+        results = _run_coroutine(_gather_async(fn, tasks, constants,
+                                               max(1, min(num_workers, n)),
+                                               pbar=pbar))
+        return collect(results)
 
 
 def update_upon_eval(fn, pbar, verbosity=1):
@@ -172,53 +501,248 @@ def update_upon_eval(fn, pbar, verbosity=1):
     return new_fn
 
 
-def _combo_runner_sequential(fn, combos, constants, n, ndim, verbosity=1):
+def _combo_runner_sequential(fn, tasks, constants, n, collect, verbosity=1):
     """Run combos in a sequential manner.
     """
     with progbar(total=n, disable=verbosity <= 0) as pbar:
 
         # Wrap the function such that the progbar is updated upon each call
         fn = update_upon_eval(fn, pbar, verbosity=verbosity)
-        return nested_submit(fn, combos, constants)
+        return collect((i, fn(**constants, **kws)) for i, kws in tasks)
+
+
+def _estimate_costs(cost, combos):
+    """Estimate the relative cost of evaluating every combo, as a flat array.
+
+    Parameters
+    ----------
+    cost : callable, xarray.DataArray or array_like
+        Either a function called with the keyword arguments of each combo, a
+        DataArray labelled by (a subset of) the combo arguments, such as
+        the timings of a previous run, or an array broadcastable to the shape
+        of the combos.
+    combos : tuple of (str, sequence)
+        The combos.
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    shape = tuple(len(vals) for _, vals in combos)
+
+    if callable(cost):
+        costs = np.reshape([cost(**kws) for _, kws in
+                            _gen_combo_kwargs(combos)], shape)
+
+    elif isinstance(cost, xr.DataArray):
+        fn_args = tuple(arg for arg, _ in combos)
+        extra_dims = set(cost.dims) - set(fn_args)
+        if extra_dims:
+            raise ValueError("The cost dimensions {} are not combo arguments."
+                             "".format(extra_dims))
+
+        # align the costs with combos, any not found are just missing
+        cost = cost.reindex({arg: vals for arg, vals in combos
+                             if arg in cost.dims})
+        cost = cost.expand_dims({arg: vals for arg, vals in combos
+                                 if arg not in cost.dims})
+        costs = cost.transpose(*fn_args).values
+
+    else:
+        costs = cost
+
+    costs = np.array(np.broadcast_to(np.asarray(costs, dtype=float), shape))
+    costs = costs.reshape(-1)
+
+    # pessimistically assume unknown costs are the most expensive
+    unknown = np.isnan(costs)
+    if unknown.all():
+        costs[:] = 0.0
+    elif unknown.any():
+        costs[unknown] = np.nanmax(costs)
+
+    return costs
+
+
+def _order_by_cost(cost, combos, indices=None):
+    """Order the flat ``indices`` of ``combos`` (by default all of them) such
+    that the most expensive are evaluated first.
+    """
+    costs = _estimate_costs(cost, combos)
+
+    if indices is None:
+        indices = np.arange(costs.size)
+    else:
+        indices = np.asarray(indices, dtype=int)
+
+    return indices[np.argsort(-costs[indices], kind='stable')]
+
+
+def _check_cache(cache, fn, combos, constants, indices, collect):
+    """Look up the combos at ``indices`` (by default all) in ``cache``,
+    returning the indices of those still to be evaluated, and a wrapped
+    ``collect`` which stores each new result in the cache and also yields the
+    already cached results.
+    """
+    base_key = joblib.hash((fn_fingerprint(fn), constants))
+
+    hits, misses, keys = [], [], {}
+    for i, kws in _gen_combo_kwargs(combos, indices):
+        key = joblib.hash((base_key, kws))
+        try:
+            hits.append((i, cache[key]))
+        except KeyError:
+            misses.append(i)
+            keys[i] = key
+
+    def gen_results(results):
+        yield from hits
+        for i, res in results:
+            cache[keys[i]] = res
+            yield i, res
+
+    def cached_collect(results):
+        return collect(gen_results(results))
+
+    return misses, cached_collect
+
+
+@contextlib.contextmanager
+def _maybe_shared_arrays(constants, share_arrays):
+    """Share the large arrays in ``constants`` with workers, if requested.
+    """
+    if not share_arrays:
+        yield constants
+        return
+
+    with shared_arrays(constants) as shared_constants:
+        yield shared_constants
 
 
 def _combo_runner(fn, combos, constants, split=False, parallel=False,
-                  num_workers=None, executor=None, verbosity=1, pool=None):
-    """Core combo runner, i.e. no parsing of arguments.
+                  num_workers=None, executor=None, verbosity=1, pool=None,
+                  chunksize=None, collect=None, indices=None,
+                  share_arrays=False, preload_fn=False, cost=None,
+                  cache=None, repeats=None):
+    """Core combo runner, i.e. no parsing of arguments. If ``collect`` is
+    given, it is called as ``collect(results, shape)`` with an iterable of
+    ``(index, result)`` pairs to assemble the output, rather than creating
+    nested tuples, and ``split`` is ignored. The pairs may arrive in any
+    order. If ``indices`` is given, only the combos at these flat positions
+    are evaluated, which requires ``collect`` to be given too. If ``cost``
+    is given, the combos are evaluated in order of decreasing cost. If
+    ``cache`` is given, only the combos not found in it are evaluated. If
+    ``repeats`` is given, a :class:`_Repeater`, each combo is evaluated in
+    rounds until it converges, see :func:`_run_in_rounds`.
     """
     executor = _choose_executor_depr_pool(executor, pool)
 
-    n = prod(len(x) for _, x in combos)
+    shape = tuple(len(x) for _, x in combos)
     ndim = len(combos)
 
-    kws = {'fn': fn, 'combos': combos, 'constants': constants, 'n': n,
-           'ndim': ndim, 'verbosity': verbosity}
+    if indices is None:
+        n = prod(shape)
+    elif collect is None:
+        raise ValueError("Can only evaluate a subset of combos if `collect` "
+                         "is also given.")
+    else:
+        n = len(indices)
+
+    if cost is not None:
+        indices = _order_by_cost(cost, combos, indices)
 
-    # Custom pool supplied
-    if executor is not None:
-        results = _combo_runner_executor(executor=executor, **kws)
+    collect_results = functools.partial(collect or collect_nested, shape=shape)
 
-    # Else for parallel, by default use a process pool-exceutor
-    elif parallel or num_workers:
-        results = _combo_runner_parallel(num_workers=num_workers, **kws)
+    if cache is not None:
+        # the repeat settings change the results too
+        key_constants = constants if repeats is None else {
+            **constants, REPEATS_VAR_NAME: repeats.settings}
+        indices, collect_results = _check_cache(cache, fn, combos,
+                                                key_constants, indices,
+                                                collect_results)
+        n = len(indices)
 
-    # Evaluate combos sequentially
-    else:
-        results = _combo_runner_sequential(**kws)
+    use_asyncio = (executor == 'asyncio') or _is_coroutine_fn(fn)
+
+    # large arrays are only worth sharing with separate workers
+    share_arrays = share_arrays and not use_asyncio and (
+        (executor is not None) or parallel or num_workers)
+
+    with _maybe_shared_arrays(constants, share_arrays) as constants:
+
+        def run(tasks, n, collect):
+            kws = {'fn': fn, 'tasks': tasks, 'constants': constants, 'n': n,
+                   'collect': collect, 'verbosity': verbosity}
+
+            # Coroutine function, or explicitly asked to use an event loop
+            if use_asyncio:
+                return _combo_runner_asyncio(num_workers=num_workers, **kws)
+
+            # Custom pool supplied
+            if executor is not None:
+                return _combo_runner_executor(executor=executor,
+                                              chunksize=chunksize, **kws)
+
+            # Else for parallel, by default use a process pool-exceutor
+            if parallel or num_workers:
+                return _combo_runner_parallel(num_workers=num_workers,
+                                              chunksize=chunksize,
+                                              preload_fn=preload_fn, **kws)
+
+            # Evaluate combos sequentially
+            return _combo_runner_sequential(**kws)
+
+        if repeats is None:
+            results = run(_gen_combo_kwargs(combos, indices), n,
+                          collect_results)
+        else:
+            if indices is None:
+                indices = range(n)
+            results = _run_in_rounds(run, repeats, combos, indices,
+                                     collect_results)
+
+    if collect is not None:
+        return results
 
     return tuple(unzip(results, ndim)) if split else results
 
 
+def _run_in_rounds(run, repeater, combos, indices, collect):
+    """Evaluate the combos at ``indices`` repeatedly, in rounds, each
+    submitting, as separate tasks, every repeat still needed by the combos
+    that have not yet converged. The repeats of a hard combo are thus spread
+    over all the workers, rather than it occupying a single one, while the
+    results are combined in ``repeater``. Finally, ``collect`` is called with
+    the statistics of every combo.
+    """
+    todo = list(indices)
+
+    while True:
+        counts = [(i, repeater.to_run(i)) for i in todo]
+        todo = [i for i, c in counts if c]
+        if not todo:
+            break
+
+        round_indices = [i for i, c in counts for _ in range(c)]
+        run(_gen_combo_kwargs(combos, round_indices), len(round_indices),
+            repeater.update)
+
+    return collect((i, repeater.result(i)) for i in indices)
+
+
 def combo_runner(fn, combos, *, constants=None, split=False,
                  parallel=False, executor=None, num_workers=None,
-                 verbosity=1, pool=None):
+                 verbosity=1, pool=None, chunksize=None, share_arrays=False,
+                 preload_fn=False, cost=None, cache=None):
     """Take a function fn and analyse it over all combinations of named
     variables' values, optionally showing progress and in parallel.
 
     Parameters
     ----------
     fn : callable
-        Function to analyse.
+        Function to analyse. If this is a coroutine function (i.e. defined
+        with ``async def``), the combos are evaluated concurrently on an
+        ``asyncio`` event loop.
     combos : mapping of individual fn arguments to sequence of values
         All combinations of each argument will be calculated. Each
         argument range thus gets a dimension in the output array(s).
@@ -228,13 +752,16 @@ def combo_runner(fn, combos, *, constants=None, split=False,
         Whether to split (unzip) into multiple output arrays or not.
     parallel : bool, optional
         Process combos in parallel, default number of workers picked.
-    executor : executor-like pool, optional
+    executor : executor-like pool or 'asyncio', optional
         Submit all combos to this pool executor. Must have ``submit`` or
         ``apply_async`` methods and API matching either ``concurrent.futures``
         or an ``ipyparallel`` view. Pools from ``multiprocessing.pool`` are
-        also  supported.
+        also  supported. ``'asyncio'`` explicitly selects the event loop,
+        which is the default for coroutine functions.
     num_workers : int, optional
-        Explicitly choose how many workers to use, None for automatic.
+        Explicitly choose how many workers to use, None for automatic. When
+        using ``asyncio`` this is the maximum number of evaluations in flight
+        at once, by default 128.
     verbosity : {0, 1, 2}, optional
         How much information to display:
 
@@ -242,6 +769,37 @@ def combo_runner(fn, combos, *, constants=None, split=False,
         - 1: just progress,
         - 2: all information.
 
+    chunksize : int or 'auto', optional
+        If given, when running in parallel or with an executor, group this
+        many contiguous combos into each submitted task, which then evaluates
+        them in a loop on the worker. This greatly reduces the overhead for
+        cheap functions. ``'auto'`` aims for around four tasks per worker.
+    share_arrays : bool, optional
+        If True, when running in parallel or with an executor, write any
+        large numpy arrays in ``constants`` once to a memory-mapped file (in
+        ``/dev/shm`` if available), which workers then attach to without
+        copying, rather than pickling the arrays along with every task. The
+        arrays are received as read-only ``numpy.memmap`` subclasses.
+    preload_fn : bool, optional
+        If True, when running in parallel with the default process pool, send
+        ``fn`` to each worker just once when it starts, rather than pickling
+        it along with every task. This is useful for closures or callable
+        objects carrying heavy state, but means the workers are restarted
+        whenever a different ``fn`` is run.
+    cost : callable, xarray.DataArray or array_like, optional
+        An estimate of how expensive each combo is, used to submit the most
+        expensive combos first (the results are still returned in the usual
+        order). This reduces the time spent waiting for a few slow combos at
+        the end of a parallel run. Either a function called with the keyword
+        arguments of each combo, a DataArray labelled by some or all of the
+        combo arguments - such as the ``'_xyz_time'`` recorded by a previous
+        run with ``profile=True`` - or an
+        array broadcastable to the shape of the combos. Unknown (``nan``)
+        costs are assumed to be the most expensive.
+    cache : ResultCache, optional
+        If given, look up each combo in this :class:`~xyzpy.ResultCache`
+        before evaluating it, and store any new results in it.
+
     Returns
     -------
     data : nested tuple
@@ -256,7 +814,9 @@ def combo_runner(fn, combos, *, constants=None, split=False,
     # Submit to core combo runner
     return _combo_runner(fn, combos, constants=constants, split=split,
                          parallel=parallel, executor=executor,
-                         num_workers=num_workers, verbosity=verbosity)
+                         num_workers=num_workers, verbosity=verbosity,
+                         chunksize=chunksize, share_arrays=share_arrays,
+                         preload_fn=preload_fn, cost=cost, cache=cache)
 
 
 def multi_concat(results, dims):
@@ -305,6 +865,13 @@ def _combos_to_ds(results, combos, var_names, var_dims, var_coords,
                 for data, name in zip(results, var_names)
             })
 
+    _set_attrs_and_constants(ds, constants, attrs)
+    return ds
+
+
+def _set_attrs_and_constants(ds, constants=None, attrs=None):
+    """Record ``attrs`` and ``constants`` on ``ds`` inplace.
+    """
     if attrs:
         ds.attrs = attrs
 
@@ -315,7 +882,368 @@ def _combos_to_ds(results, combos, var_names, var_dims, var_coords,
                 ds.coords[k] = v
             else:
                 ds.attrs[k] = v
-    return ds
+
+
+def _auto_chunks(shape, target):
+    """Choose chunks for an array of ``shape`` with around ``target``
+    elements each, keeping the trailing dimensions whole where possible.
+    """
+    chunks = []
+    size = 1
+    for d in reversed(shape):
+        c = max(1, min(d, target // size))
+        chunks.append(c)
+        size *= c
+    return tuple(reversed(chunks))
+
+
+class _ZarrStreamWriter:
+    """Collector for :func:`_combo_runner` that, rather than holding all the
+    results in memory, buffers ``(index, result)`` pairs and every
+    ``flush_every`` results writes them directly into the relevant chunks of
+    an on-disk zarr store. The store is created, with every point initially
+    missing, from the first result.
+    """
+
+    def __init__(self, store, combos, var_names, var_dims, var_coords,
+                 constants=None, attrs=None, flush_every=1):
+        self.store = store
+        self.combos = combos
+        self.var_names = var_names
+        self.var_dims = var_dims
+        self.var_coords = var_coords
+        self.constants = constants
+        self.attrs = attrs
+        self.flush_every = flush_every
+        self._group = None
+
+    def _create(self, res, shape):
+        """Write the store metadata and coordinates, but no data.
+        """
+        import dask.array as da
+
+        fn_args = tuple(arg for arg, _ in self.combos)
+
+        data_vars = {}
+        for name, x in zip(self.var_names, res):
+            x = np.asarray(x)
+            if x.dtype.kind in 'biu':
+                # need to be able to mark points as missing
+                dtype = np.dtype(float)
+            elif x.dtype.kind in 'fc':
+                dtype = x.dtype
+            else:
+                raise TypeError("Can only stream numeric results, but "
+                                "variable '{}' has dtype {}."
+                                "".format(name, x.dtype))
+
+            full_shape = shape + x.shape
+            chunks = _auto_chunks(full_shape, max(self.flush_every, x.size))
+            data = da.full(full_shape, np.nan, dtype=dtype, chunks=chunks)
+            data_vars[name] = (fn_args + self.var_dims[name], data)
+
+        ds = xr.Dataset(coords={**dict(self.combos),
+                                **dict(self.var_coords)},
+                        data_vars=data_vars)
+        _set_attrs_and_constants(ds, self.constants, self.attrs)
+
+        # only the numpy backed coordinates are actually written
+        ds.to_zarr(self.store, compute=False)
+
+    def _flush(self, buffer, shape):
+        import zarr
+
+        if self._group is None:
+            if not os.path.exists(self.store):
+                self._create(buffer[0][1], shape)
+            self._group = zarr.open_group(self.store, mode='r+')
+
+        size = len(buffer)
+        ixs = np.unravel_index([i for i, _ in buffer], shape)
+
+        for j, name in enumerate(self.var_names):
+            data = np.stack([np.asarray(res[j]) for _, res in buffer])
+
+            # coordinates of every single element to write
+            var_shape, var_size = data.shape[1:], data[0].size
+            var_ixs = (np.unravel_index(np.arange(var_size), var_shape)
+                       if var_shape else ())
+            coords = (tuple(np.repeat(ix, var_size) for ix in ixs) +
+                      tuple(np.tile(ix, size) for ix in var_ixs))
+
+            self._group[name].set_coordinate_selection(coords,
+                                                       data.reshape(-1))
+
+    def __call__(self, results, shape):
+        single = len(self.var_names) == 1
+
+        buffer = []
+        for i, res in results:
+            buffer.append((i, (res,) if single else res))
+            if len(buffer) >= self.flush_every:
+                self._flush(buffer, shape)
+                buffer = []
+
+        if buffer:
+            self._flush(buffer, shape)
+
+
+def _combo_runner_to_zarr(fn, combos, var_names, var_dims, var_coords,
+                          constants, resources, attrs, store,
+                          flush_every=None, **combo_runner_settings):
+    """Evaluate all combos, streaming the results into the zarr ``store``,
+    skipping any combos already present in it, and return the lazily loaded
+    dataset.
+    """
+    from .case_runner import _missing_mask
+
+    if None in var_names:
+        raise ValueError("Streaming results to disk requires `var_names`.")
+
+    fn_args = tuple(arg for arg, _ in combos)
+    shape = tuple(len(vals) for _, vals in combos)
+
+    if os.path.exists(store):
+        # resuming - check the store matches then find combos left to run
+        with xr.open_zarr(store) as ds:
+            for arg, vals in combos:
+                if (arg not in ds.dims) or (ds.dims[arg] != len(vals)) or (
+                        not np.array_equal(ds[arg].values, vals)):
+                    raise ValueError("The combos for '{}' don't match those "
+                                     "in the existing store at {}."
+                                     "".format(arg, store))
+            missing_vars = set(var_names) - set(ds.data_vars)
+            if missing_vars:
+                raise ValueError("The variables {} are not in the existing "
+                                 "store at {}.".format(missing_vars, store))
+
+            mask = _missing_mask(ds[list(var_names)], fn_args)
+            indices = np.flatnonzero(mask)
+    else:
+        indices = None
+
+    if flush_every is None:
+        # write roughly every 1% of the combos
+        flush_every = max(1, prod(shape) // 100)
+
+    writer = _ZarrStreamWriter(store, combos,
+                               var_names=var_names,
+                               var_dims=var_dims,
+                               var_coords=var_coords,
+                               constants=constants,
+                               attrs=attrs,
+                               flush_every=flush_every)
+
+    _combo_runner(fn, combos, constants={**resources, **constants},
+                  collect=writer, indices=indices, **combo_runner_settings)
+
+    return xr.open_zarr(store)
+
+
+# names of the extra variables recorded when profiling
+PROFILE_VAR_NAMES = ('_xyz_time', '_xyz_cpu_time', '_xyz_peak_rss',
+                     '_xyz_pid')
+
+
+def _reset_peak_rss():
+    """Reset the peak resident memory of this process to its current value,
+    returning whether this is possible (linux only).
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss(reset=False):
+    """The peak resident memory of this process, in bytes, either since it
+    was last reset with :func:`_reset_peak_rss`, if ``reset``, or ever.
+    """
+    if reset:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return 1024 * int(line.split()[1])
+
+    try:
+        import resource
+    except ImportError:  # pragma: no cover
+        # e.g. windows
+        return np.nan
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in kilobytes on linux but bytes on mac
+    return rss if sys.platform == 'darwin' else 1024 * rss
+
+
+class _ProfiledFn:
+    """Wrap ``fn`` such that its output(s) are followed by the wall time, cpu
+    time, peak RSS and PID of the process which evaluated it. Where possible
+    the peak RSS is reset before each evaluation, so that it is that of the
+    evaluation alone, else it is the peak of the whole process so far.
+    """
+
+    def __init__(self, fn, single_output=False):
+        self.fn = fn
+        self.single_output = single_output
+
+    def _start(self):
+        reset = _reset_peak_rss()
+        return time.perf_counter(), time.process_time(), reset
+
+    def _with_stats(self, res, t0, c0, reset):
+        stats = (time.perf_counter() - t0, time.process_time() - c0,
+                 _peak_rss(reset), os.getpid())
+        return ((res,) if self.single_output else tuple(res)) + stats
+
+    def __call__(self, *args, **kwargs):
+        start = self._start()
+        res = self.fn(*args, **kwargs)
+        return self._with_stats(res, *start)
+
+
+class _AsyncProfiledFn(_ProfiledFn):
+
+    async def __call__(self, *args, **kwargs):
+        start = self._start()
+        res = await self.fn(*args, **kwargs)
+        return self._with_stats(res, *start)
+
+
+def _add_profiling(fn, var_names, var_dims):
+    """Wrap ``fn`` so that it also outputs the variables
+    ``PROFILE_VAR_NAMES``, and add these to ``var_names`` and ``var_dims``.
+    """
+    if None in var_names:
+        raise ValueError("Profiling requires `var_names` to be given.")
+
+    cls = _AsyncProfiledFn if _is_coroutine_fn(fn) else _ProfiledFn
+    fn = cls(fn, single_output=len(var_names) == 1)
+    var_names = (*var_names, *PROFILE_VAR_NAMES)
+    var_dims = {**var_dims, **{name: () for name in PROFILE_VAR_NAMES}}
+    return fn, var_names, var_dims
+
+
+# name of the extra variable recording how many times each point was repeated
+REPEATS_VAR_NAME = '_xyz_repeats'
+
+
+class _Repeater:
+    """Running statistics of the repeated evaluations of every point, which
+    are submitted in rounds and combined here, in the parent process. Each
+    output is averaged, with the error on its mean computed using the same
+    updates and convergence criterion as
+    :class:`~xyzpy.utils.RunningStatistics`, but elementwise for any array
+    outputs. Any profiling outputs are instead totalled.
+    """
+
+    def __init__(self, repeats, rtol, atol, min_repeats=5, num_vars=1,
+                 profiled=False):
+        self.repeats = repeats
+        self.rtol = rtol
+        self.atol = atol
+        self.min_repeats = min(min_repeats, repeats)
+        self.num_vars = num_vars
+        self.profiled = profiled
+        self.single_output = (num_vars == 1) and not profiled
+        self.stats = {}
+
+    @property
+    def settings(self):
+        return (self.repeats, self.rtol, self.atol, self.min_repeats)
+
+    def update(self, results):
+        """Add each ``(index, result)`` pair to the running statistics.
+        """
+        for i, res in results:
+            if self.single_output:
+                res = (res,)
+
+            xs = [np.asarray(x, dtype=float) for x in res[:self.num_vars]]
+
+            try:
+                n, means, M2s, prof = self.stats[i]
+            except KeyError:
+                n = 0
+                means = [np.zeros_like(x) for x in xs]
+                M2s = [np.zeros_like(x) for x in xs]
+                prof = (0.0, 0.0, np.nan, None)
+
+            n += 1
+            for x, mean, M2 in zip(xs, means, M2s):
+                delta = x - mean
+                mean += delta / n
+                M2 += delta * (x - mean)
+
+            if self.profiled:
+                # total time, cpu time, overall peak rss and last pid
+                t, c, rss, pid = res[self.num_vars:]
+                prof = (prof[0] + t, prof[1] + c, np.fmax(prof[2], rss), pid)
+
+            self.stats[i] = (n, means, M2s, prof)
+
+    def _errs(self, i):
+        n, _, M2s, _ = self.stats[i]
+        return [(M2 / n)**0.5 / n**0.5 for M2 in M2s]
+
+    def to_run(self, i):
+        """How many more times to evaluate point ``i`` - none if it has
+        converged, else as many again as it has already been, within the
+        limits set by ``min_repeats`` and ``repeats``.
+        """
+        n, means = self.stats[i][:2] if i in self.stats else (0, None)
+
+        if n < self.min_repeats:
+            return self.min_repeats - n
+        if n >= self.repeats:
+            return 0
+        if all(np.all(err < self.rtol * abs(mean) + self.atol)
+               for err, mean in zip(self._errs(i), means)):
+            return 0
+        return min(n, self.repeats - n)
+
+    def result(self, i):
+        """The means, then errors on the means, of every output of point
+        ``i``, followed by the number of repeats taken and any profiling.
+        """
+        errs = self._errs(i)
+        n, means, _, prof = self.stats.pop(i)
+        # unwrap any scalar outputs
+        res = (*(m[()] for m in means), *(e[()] for e in errs), n)
+        if self.profiled:
+            res += prof
+        return res
+
+
+def _add_repeats(var_names, var_dims, repeats, rtol=0.02, atol=None,
+                 min_repeats=5, profiled=False):
+    """Create the :class:`_Repeater` for repeating each point until
+    converged, adding the ``'{var}_err'`` variables and ``REPEATS_VAR_NAME``
+    to ``var_names`` and ``var_dims``, before any profiling variables.
+    """
+    if None in var_names:
+        raise ValueError("Repeating requires `var_names` to be given.")
+    if atol is None:
+        atol = rtol
+
+    if profiled:
+        var_names = var_names[:-len(PROFILE_VAR_NAMES)]
+
+    repeater = _Repeater(repeats, rtol, atol, min_repeats=min_repeats,
+                         num_vars=len(var_names), profiled=profiled)
+
+    err_names = tuple(name + '_err' for name in var_names)
+    var_dims = {**var_dims,
+                **{e: var_dims.get(v, ()) for v, e in zip(var_names,
+                                                          err_names)},
+                REPEATS_VAR_NAME: ()}
+    var_names = (*var_names, *err_names, REPEATS_VAR_NAME)
+    if profiled:
+        var_names += PROFILE_VAR_NAMES
+
+    return repeater, var_names, var_dims
 
 
 def combo_runner_to_ds(fn, combos, var_names, *,
@@ -325,6 +1253,13 @@ def combo_runner_to_ds(fn, combos, var_names, *,
                        resources=None,
                        attrs=None,
                        parse=True,
+                       stream_to=None,
+                       stream_every=None,
+                       profile=False,
+                       repeats=None,
+                       rtol=0.02,
+                       atol=None,
+                       min_repeats=5,
                        **combo_runner_settings):
     """Evaluate a function over all combinations and output to a Dataset.
 
@@ -351,13 +1286,54 @@ def combo_runner_to_ds(fn, combos, var_names, *,
         Like `constants` but they will not be recorded.
     attrs : mapping, optional
         Any extra attributes to store.
+    stream_to : str, optional
+        If given, the path of a zarr store to write the results into as they
+        are completed, rather than holding them all in memory. If the store
+        already exists, any combos already present in it are skipped, so that
+        an interrupted run can simply be resumed. The results must be numeric,
+        and integer results are stored as floats so that missing data can be
+        marked.
+    stream_every : int, optional
+        When streaming, how many results to buffer between writes to disk,
+        defaults to around 1% of all the combos.
+    profile : bool, optional
+        If True, also record, for every combo, the wall time and cpu time
+        taken, the peak memory (RSS, in bytes) and the PID of the process
+        that evaluated it, as the variables ``'_xyz_time'``,
+        ``'_xyz_cpu_time'``, ``'_xyz_peak_rss'`` and ``'_xyz_pid'``
+        respectively. On linux, the peak memory is reset before each
+        evaluation, so is the peak while evaluating that combo, elsewhere it
+        is the peak of the process so far. Note the cpu time and peak memory
+        are those of the whole process, so only indicative if it is running
+        several evaluations at once (e.g. with threads).
+    repeats : int, optional
+        If given, ``fn`` is assumed to be stochastic, and each combo is
+        evaluated up to this many times, stopping once the error on the mean
+        of every output is less than ``rtol * abs(mean) + atol``. The
+        variables are then the means, with the errors on the means as the
+        extra variables ``'{var}_err'``, and the number of repeats taken as
+        ``'_xyz_repeats'``. The repeats are submitted in rounds, each
+        evaluating the combos yet to converge as many times again (at first
+        ``min_repeats`` times), as separate tasks, so that those that
+        converge quickly free up workers for the repeats of harder ones. If
+        profiling, the times are totalled over all the repeats. See also
+        :func:`~xyzpy.estimate_from_repeats`.
+    rtol : float, optional
+        The relative tolerance on the error of the mean, if repeating.
+    atol : float, optional
+        The absolute tolerance on the error of the mean, if repeating,
+        defaults to ``rtol``.
+    min_repeats : int, optional
+        If repeating, evaluate each combo at least this many times before
+        checking whether it has converged.
     combo_runner_settings
         Arguments supplied to :func:`~xyzpy.combo_runner`.
 
     Returns
     -------
     ds : xarray.Dataset
-        Multidimensional labelled dataset contatining all the results.
+        Multidimensional labelled dataset contatining all the results. If
+        ``stream_to`` was given this is lazily loaded from the store.
     """
     if parse:
         combos = _parse_combos(combos)
@@ -367,7 +1343,32 @@ def combo_runner_to_ds(fn, combos, var_names, *,
         constants = _parse_constants(constants)
         resources = _parse_resources(resources)
 
-    # Generate data for all combos
+    if profile:
+        fn, var_names, var_dims = _add_profiling(fn, var_names, var_dims)
+
+    if repeats is not None:
+        combo_runner_settings['repeats'], var_names, var_dims = _add_repeats(
+            var_names, var_dims, repeats, rtol=rtol, atol=atol,
+            min_repeats=min_repeats, profiled=profile)
+
+    if stream_to is not None:
+        return _combo_runner_to_zarr(fn, combos,
+                                     var_names=var_names,
+                                     var_dims=var_dims,
+                                     var_coords=var_coords,
+                                     constants=constants,
+                                     resources=resources,
+                                     attrs=attrs,
+                                     store=stream_to,
+                                     flush_every=stream_every,
+                                     **combo_runner_settings)
+
+    # Generate data for all combos - if the outputs are not labelled xarray
+    #     objects, write them directly into preallocated arrays
+    if None not in var_names:
+        combo_runner_settings['collect'] = functools.partial(
+            collect_arrays, num_vars=len(var_names))
+
     results = _combo_runner(fn, combos, constants={**resources, **constants},
                             split=len(var_names) > 1,
                             **combo_runner_settings)
@@ -2,12 +2,20 @@
 """
 
 import os
+import json
+import time
+import uuid
 import shutil
 import functools
+import inspect
+import warnings
+import threading
+import contextlib
 
 import numpy as np
 import pandas as pd
 import xarray as xr
+import joblib
 
 from .prepare import (
     _parse_fn_args,
@@ -21,8 +29,10 @@ from .prepare import (
     _parse_attrs,
 )
 from .combo_runner import combo_runner_to_ds
-from .case_runner import case_runner_to_ds
-from ..manage import load_ds, save_ds, load_df, save_df
+from .case_runner import case_runner_to_ds, _missing_mask
+from ..manage import (
+    load_ds, save_ds, load_df, save_df, auto_add_extension, _atomic_path,
+)
 from . import batch
 
 
@@ -335,6 +345,51 @@ def label(var_names,
 #                                 HARVESTER                                   #
 # --------------------------------------------------------------------------- #
 
+_MANIFEST_NAME = 'manifest.jsonl'
+
+# guards reading then re-writing the manifest of sharded harvesters, between
+#     threads - processes also lock the file ``data_name + '.manifest.lock'``
+_MANIFEST_LOCK = threading.Lock()
+
+
+@contextlib.contextmanager
+def _file_lock(path, blocking=True):
+    """Hold an exclusive lock on the file ``path`` (created if necessary),
+    yielding whether it was acquired - which is always the case if
+    ``blocking=True``.
+    """
+    import fcntl
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except BlockingIOError:
+            yield False
+            return
+
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def _merge_datasets(old_ds, new_ds, overwrite=None):
+    """Combine ``new_ds`` into ``old_ds``, see :meth:`Harvester.add_ds`.
+    """
+    # Overwrite with new data
+    if overwrite is True:
+        return new_ds.combine_first(old_ds)
+    # Overwrite nothing
+    if overwrite is False:
+        return old_ds.combine_first(new_ds)
+    # Merge, raising error if the two datasets conflict
+    return old_ds.merge(new_ds, compat='no_conflicts')
+
+
 class Harvester(object):
     """Container class for collecting and aggregating data to disk.
 
@@ -352,6 +407,29 @@ class Harvester(object):
     full_ds : xarray.Dataset, optional
         Initialize the Harvester with this dataset as the intitial full
         dataset.
+    sharded : bool, optional
+        If True, ``data_name`` is a directory in which the data from each
+        harvest is written as a new, never modified, shard, with a manifest
+        recording their order and how they should be combined. Adding data
+        then only costs writing the new data, rather than re-writing the
+        whole dataset. The shards are lazily combined, by default as dask
+        arrays, when the full dataset is loaded, though new data is first
+        checked not to conflict where it overlaps with the existing data. Use
+        :meth:`Harvester.consolidate` to compact them.
+    lock : bool, optional
+        If True, hold an exclusive lock on the file ``data_name + '.lock'``
+        whilst loading, merging and saving the full dataset, so that many
+        processes can safely harvest into the same data. Requires ``fcntl``.
+    write_ahead : bool, optional
+        If True (implies ``lock=True``), new data is first saved into the
+        queue directory ``data_name + '.queue'``, then merged in by whichever
+        process holds the lock. Rather than waiting, processes that cannot
+        immediately acquire the lock leave their data to be merged by the
+        current holder, so that harvesting never blocks. The full dataset
+        only reflects the new data once it has been merged. Data that can't
+        be merged, e.g. due to conflicts, is moved to the directory
+        ``data_name + '.queue/failed'``, and the error raised by
+        :meth:`~xyzpy.Harvester.add_ds` if it was merged by the same process.
 
     Members
     -------
@@ -363,12 +441,17 @@ class Harvester(object):
     """
 
     def __init__(self, runner, data_name=None, chunks=None,
-                 engine='h5netcdf', full_ds=None):
+                 engine='h5netcdf', full_ds=None, sharded=False,
+                 lock=False, write_ahead=False):
         self.runner = runner
         self.data_name = data_name
         self.engine = engine
         self.chunks = chunks
+        self.sharded = sharded
+        self.lock = lock or write_ahead
+        self.write_ahead = write_ahead
         self._full_ds = full_ds
+        self._lock_depth = 0
 
     @property
     def fn(self):
@@ -401,6 +484,15 @@ class Harvester(object):
         if chunks is None:
             chunks = self.chunks
 
+        if self.sharded:
+            shards = self._read_manifest()
+            if shards:
+                if chunks is None:
+                    # use the on-disk chunks of each shard
+                    chunks = {}
+                self._full_ds = self._combine_shards(shards, chunks=chunks)
+            return
+
         # Check file exists and can be written to
         if os.access(self.data_name, os.W_OK):
             self._full_ds = load_ds(self.data_name,
@@ -416,6 +508,362 @@ class Harvester(object):
             raise OSError("The file '{}' exists but cannot be written "
                           "to".format(self.data_name))
 
+    # Locking --------------------------------------------------------------- #
+
+    @contextlib.contextmanager
+    def _locked(self, blocking=True):
+        """Hold the lock on the on-disk data, if locking, re-entrantly.
+        """
+        if (not self.lock) or (self._lock_depth > 0):
+            self._lock_depth += 1
+            try:
+                yield True
+            finally:
+                self._lock_depth -= 1
+            return
+
+        with _file_lock(self.data_name + '.lock', blocking) as acquired:
+            if acquired:
+                self._lock_depth += 1
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    self._lock_depth -= 1
+
+    @property
+    def _queue_dir(self):
+        return self.data_name + '.queue'
+
+    def _queued(self):
+        """The names of queued datasets, oldest first.
+        """
+        try:
+            # n.b. ignore hidden, still being written, files
+            return sorted(f for f in os.listdir(self._queue_dir)
+                          if f.endswith('.dmp') and not f.startswith('.'))
+        except FileNotFoundError:
+            return []
+
+    def _enqueue(self, new_ds, overwrite=None):
+        """Save ``new_ds`` into the write-ahead queue.
+        """
+        os.makedirs(self._queue_dir, exist_ok=True)
+        name = '{:020d}-{}.dmp'.format(int(time.time() * 10**9),
+                                       uuid.uuid4().hex)
+        path = os.path.join(self._queue_dir, name)
+
+        # write then move, so that a partial file is never merged
+        with _atomic_path(path) as tmp_path:
+            joblib.dump((overwrite, new_ds.compute()), tmp_path)
+
+        return name
+
+    @property
+    def _failed_dir(self):
+        return os.path.join(self._queue_dir, 'failed')
+
+    def _fail_queued(self, name, error):
+        """Move the queued dataset ``name``, which couldn't be merged, out of
+        the queue, recording ``error`` for the process that queued it.
+        """
+        os.makedirs(self._failed_dir, exist_ok=True)
+        joblib.dump(error, os.path.join(self._failed_dir, name + '.err'))
+        os.replace(os.path.join(self._queue_dir, name),
+                   os.path.join(self._failed_dir, name))
+
+    def _raise_if_failed(self, name):
+        """Raise the error from merging the queued dataset ``name``, if it
+        has failed. The failed data itself is left in ``'.queue/failed'``.
+        """
+        err_path = os.path.join(self._failed_dir, name + '.err')
+        try:
+            error = joblib.load(err_path)
+        except FileNotFoundError:
+            return
+        os.remove(err_path)
+        raise error
+
+    def _merge_queued(self, names, chunks=None, engine=None):
+        """Merge the queued datasets ``names``, in order, then remove them.
+        Any that conflict are moved aside, rather than blocking the queue.
+        """
+        if self.sharded:
+            for name in names:
+                path = os.path.join(self._queue_dir, name)
+                overwrite, new_ds = joblib.load(path)
+                try:
+                    self._add_shard(new_ds, overwrite=overwrite,
+                                    engine=engine)
+                except Exception as error:
+                    self._fail_queued(name, error)
+                else:
+                    os.remove(path)
+            self._full_ds = None
+            return
+
+        self.load_full_ds(chunks=chunks, engine=engine)
+        new_full_ds = self._full_ds
+        merged = []
+        for name in names:
+            path = os.path.join(self._queue_dir, name)
+            overwrite, new_ds = joblib.load(path)
+            if new_full_ds is None:
+                new_full_ds = new_ds
+            else:
+                try:
+                    new_full_ds = _merge_datasets(new_full_ds, new_ds,
+                                                  overwrite)
+                except Exception as error:
+                    self._fail_queued(name, error)
+                    continue
+            merged.append(path)
+
+        if merged:
+            self.save_full_ds(new_full_ds, engine=engine)
+        for path in merged:
+            os.remove(path)
+
+    def drain_queue(self, blocking=True, chunks=None, engine=None):
+        """Merge any datasets in the write-ahead queue into the full dataset.
+
+        Parameters
+        ----------
+        blocking : bool, optional
+            If False, and another process holds the lock, return immediately
+            and leave the queue to that process.
+        chunks : int or dict, optional
+            If not None, passed to xarray so that the full dataset is loaded
+            and merged into with on-disk dask arrays.
+        engine : str, optional
+            Engine to use to save and load datasets.
+        """
+        while True:
+            with self._locked(blocking=blocking) as acquired:
+                if not acquired:
+                    return
+
+                names = self._queued()
+                while names:
+                    self._merge_queued(names, chunks=chunks, engine=engine)
+                    names = self._queued()
+
+            # data queued just before releasing the lock would be left
+            if not self._queued():
+                return
+            blocking = False
+
+    # Sharded storage ------------------------------------------------------- #
+
+    @property
+    def _manifest_path(self):
+        return os.path.join(self.data_name, _MANIFEST_NAME)
+
+    @contextlib.contextmanager
+    def _manifest_locked(self):
+        """Exclusively hold the manifest, whether or not ``lock=True``, since
+        consolidating re-writes it and so would lose concurrently appended
+        shards.
+        """
+        with _MANIFEST_LOCK:
+            try:
+                import fcntl  # noqa: F401
+            except ImportError:  # pragma: no cover
+                # e.g. windows, only safe within a single process
+                yield
+                return
+
+            with _file_lock(self.data_name + '.manifest.lock'):
+                yield
+
+    def _read_manifest(self):
+        """Read the list of shards, in the order they were added.
+        """
+        try:
+            with open(self._manifest_path) as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _write_shard(self, ds, engine):
+        """Save ``ds`` as a new shard file, returning its manifest entry.
+        """
+        os.makedirs(self.data_name, exist_ok=True)
+        name = auto_add_extension('shard-{}'.format(uuid.uuid4().hex), engine)
+        save_ds(ds, os.path.join(self.data_name, name), engine=engine)
+        return {'shard': name, 'engine': engine}
+
+    def _check_no_conflicts(self, ds):
+        """Check that ``ds`` doesn't conflict with the data in the current
+        shards, only comparing (lazily) where they overlap.
+        """
+        existing = self._combine_shards(self._read_manifest(), region=ds)
+        if existing is not None:
+            xr.merge([existing, ds], compat='no_conflicts', join='inner')
+
+    def _add_shard(self, ds, overwrite=None, engine=None):
+        """Write ``ds`` as a new shard, then record it in the manifest. If
+        ``overwrite`` is None, it is checked not to conflict with the existing
+        data whilst holding the manifest, since the shards are only actually
+        merged once loaded.
+        """
+        if engine is None:
+            engine = self.engine
+
+        entry = self._write_shard(ds, engine)
+        entry['overwrite'] = overwrite
+
+        with self._locked(), self._manifest_locked():
+            if overwrite is None:
+                try:
+                    self._check_no_conflicts(ds)
+                except Exception:
+                    self._remove_shard(entry)
+                    raise
+
+            with open(self._manifest_path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+
+    def _combine_shards(self, shards, chunks=None, region=None):
+        """Load and combine ``shards``, in order, into a single dataset.
+        Consecutive shards that are simply merged are done so all at once.
+        If ``region`` is given, only load the part of each shard that
+        overlaps with its coordinates.
+        """
+        full_ds = None
+        to_merge = []
+
+        def merge_all(full_ds, to_merge):
+            if full_ds is not None:
+                to_merge.insert(0, full_ds)
+            if len(to_merge) == 1:
+                return to_merge[0]
+            return xr.merge(to_merge, compat='no_conflicts',
+                            combine_attrs='override')
+
+        for entry in shards:
+            file_name = os.path.join(self.data_name, entry['shard'])
+            if region is None:
+                ds = load_ds(file_name, engine=entry['engine'], chunks=chunks)
+            else:
+                # n.b. lazily indexed, so only the region is read
+                with load_ds(file_name, engine=entry['engine'],
+                             load_to_mem=False) as ds:
+                    overlap = {
+                        dim: ds.indexes[dim].intersection(region.indexes[dim])
+                        for dim in ds.dims if dim in region.indexes
+                    }
+                    if any(len(ix) == 0 for ix in overlap.values()):
+                        continue
+                    ds = ds.sel(overlap).load()
+
+            if entry['overwrite'] is None:
+                to_merge.append(ds)
+                continue
+
+            if to_merge:
+                full_ds, to_merge = merge_all(full_ds, to_merge), []
+
+            if full_ds is None:
+                full_ds = ds
+            else:
+                full_ds = _merge_datasets(full_ds, ds, entry['overwrite'])
+
+        if to_merge:
+            full_ds = merge_all(full_ds, to_merge)
+
+        return full_ds
+
+    def _remove_shard(self, entry):
+        """Delete the file of shard ``entry``, if it still exists.
+        """
+        path = os.path.join(self.data_name, entry['shard'])
+        with contextlib.suppress(FileNotFoundError):
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+    def _replace_shards(self, ds, engine=None, old_shards=None):
+        """Replace ``old_shards``, by default every current shard, with the
+        single dataset ``ds``. Any shards added since are kept. If the
+        manifest no longer starts with ``old_shards``, e.g. because another
+        harvester has since consolidated them, nothing is replaced.
+
+        Returns
+        -------
+        bool
+            Whether the shards were replaced.
+        """
+        if engine is None:
+            engine = self.engine
+
+        entry = self._write_shard(ds, engine)
+        entry['overwrite'] = None
+
+        # atomically swap in the new manifest, then clean up
+        with self._locked(), self._manifest_locked():
+            shards = self._read_manifest()
+            if old_shards is None:
+                old_shards = shards
+            elif shards[:len(old_shards)] != old_shards:
+                self._remove_shard(entry)
+                return False
+
+            with _atomic_path(self._manifest_path) as tmp_manifest:
+                with open(tmp_manifest, 'w') as f:
+                    for e in [entry, *shards[len(old_shards):]]:
+                        f.write(json.dumps(e) + '\n')
+
+        for old_entry in old_shards:
+            self._remove_shard(old_entry)
+
+        return True
+
+    def consolidate(self, background=False):
+        """Compact the shards of a sharded harvester into a single shard,
+        so that loading the full dataset is quick again. Shards added while
+        this is happening are kept separately, and if another harvester
+        consolidates the shards in the meantime, this starts over with the
+        new shards.
+
+        Parameters
+        ----------
+        background : bool, optional
+            If True, consolidate in a separate thread, and return it
+            immediately.
+
+        Returns
+        -------
+        threading.Thread or None
+        """
+        if not self.sharded:
+            raise ValueError("Only sharded harvesters can be consolidated.")
+
+        if background:
+            thread = threading.Thread(target=self.consolidate)
+            thread.start()
+            return thread
+
+        while True:
+            shards = self._read_manifest()
+            if len(shards) < 2:
+                return
+
+            try:
+                replaced = self._replace_shards(
+                    self._combine_shards(shards, chunks={}),
+                    old_shards=shards)
+            except FileNotFoundError:
+                # shards removed whilst reading, by another consolidation
+                replaced = False
+
+            # may reference the removed shards, reload when next needed
+            self._full_ds = None
+
+            if replaced:
+                return
+
     @property
     def full_ds(self):
         """Dataset containing all saved runs.
@@ -438,20 +886,34 @@ class Harvester(object):
         if engine is None:
             engine = self.engine
 
-        if new_full_ds is not None:
-            if os.path.exists(self.data_name):
-                if engine == 'zarr':
-                    shutil.rmtree(self.data_name)
-                else:
-                    os.remove(self.data_name)
-            self._full_ds = new_full_ds
+        if new_full_ds is None:
+            new_full_ds = self.full_ds
+
+        if self.sharded:
+            self._replace_shards(new_full_ds, engine=engine)
+            # may reference the removed shards, reload when next needed
+            self._full_ds = None
+            return
+
+        self._full_ds = new_full_ds
 
-        save_ds(self._full_ds, self.data_name, engine=engine)
+        # n.b. this writes a new file and then atomically moves it into place
+        with self._locked():
+            save_ds(self._full_ds, self.data_name, engine=engine)
 
     def delete_ds(self, backup=False):
         """Delete the on-disk dataset, optionally backing it up first.
         """
-        from ..manage import auto_add_extension
+        if self.sharded:
+            if backup:
+                import datetime
+                ts = '{:%Y%m%d-%H%M%S}'.format(datetime.datetime.now())
+                shutil.copytree(self.data_name,
+                                self.data_name + '.BAK-{}'.format(ts))
+            shutil.rmtree(self.data_name)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.data_name + '.manifest.lock')
+            return
 
         file_name = auto_add_extension(self.data_name, self.engine)
 
@@ -505,36 +967,74 @@ class Harvester(object):
 
         # only sync with disk if data name present
         sync_with_disk = sync and (self.data_name is not None)
-        if sync_with_disk:
-            self.load_full_ds(chunks=chunks, engine=engine)
 
-        if self._full_ds is None:
-            # No full ds yet, deep copy to maintain distinction between
-            #   'full_ds' and 'last_ds'.
-            new_full_ds = new_ds.copy(deep=True)
+        if sync_with_disk and self.write_ahead:
+            name = self._enqueue(new_ds, overwrite=overwrite)
+            # reload when next needed, in case merged by another process
+            self._full_ds = None
+            self.drain_queue(blocking=False, chunks=chunks, engine=engine)
+            # n.b. if merged later by another process, any error is only
+            #     recorded in the failed directory
+            self._raise_if_failed(name)
+            return
+
+        if sync_with_disk and self.sharded:
+            # just write the new data - full_ds is combined when next needed
+            self._add_shard(new_ds, overwrite=overwrite, engine=engine)
+            self._full_ds = None
+            return
+
+        with (self._locked() if sync_with_disk else contextlib.ExitStack()):
+            if sync_with_disk:
+                self.load_full_ds(chunks=chunks, engine=engine)
+
+            if self._full_ds is None:
+                # No full ds yet, deep copy to maintain distinction between
+                #   'full_ds' and 'last_ds'.
+                new_full_ds = new_ds.copy(deep=True)
 
-        else:
-            # Overwrite with new data
-            if overwrite is True:
-                new_full_ds = new_ds.combine_first(self._full_ds)
-            # Overwrite nothing
-            elif overwrite is False:
-                new_full_ds = self._full_ds.combine_first(new_ds)
-            # Merge, raising error if the two datasets conflict
             else:
-                new_full_ds = self._full_ds.merge(
-                    new_ds, compat='no_conflicts')
+                new_full_ds = _merge_datasets(self._full_ds, new_ds,
+                                              overwrite)
 
-        if sync_with_disk:
-            self.save_full_ds(new_full_ds, engine=engine)
-        else:
-            self._full_ds = new_full_ds
+            if sync_with_disk:
+                self.save_full_ds(new_full_ds, engine=engine)
+            else:
+                self._full_ds = new_full_ds
+
+    def _find_missing_combos(self, combos):
+        """Find which of ``combos`` are not yet present in ``full_ds``.
+
+        Returns
+        -------
+        cases : tuple of tuple or None
+            The missing combos as cases, or None if the existing data doesn't
+            cover the arguments of ``combos`` such that all need running.
+        """
+        full_ds = self._full_ds
+        if full_ds is None:
+            return None
+
+        fn_args = tuple(arg for arg, _ in combos)
+        var_dims = set().union(*self.runner.var_dims.values())
+
+        # can only compare if the data is labelled by exactly these arguments
+        if set(full_ds.dims) - var_dims != set(fn_args):
+            return None
+
+        requested = full_ds.reindex({arg: vals for arg, vals in combos})
+        mask = _missing_mask(requested, fn_args)
+
+        return tuple(zip(*(np.asarray(vals, dtype=object)[ix]
+                           for (_, vals), ix in zip(combos,
+                                                    np.nonzero(mask)))))
 
     def harvest_combos(self, combos, *,
                        sync=True,
                        overwrite=None,
                        chunks=None,
                        engine=None,
+                       skip_existing=False,
                        **runner_settings):
         """Run combos, automatically merging into an on-disk dataset.
 
@@ -558,9 +1058,32 @@ class Harvester(object):
             loaded and merged into with on-disk dask arrays.
         engine : str, optional
             Engine to use to save and load datasets.
+        skip_existing : bool, optional
+            If True, only run the combos not already present in the full
+            dataset, e.g. when extending a previous sweep. These are run as
+            cases, and the data for the existing combos is untouched.
         runner_settings
             Supplied to :func:`~xyzpy.combo_runner`.
         """
+        if skip_existing:
+            combos = _parse_combos(combos)
+
+            if sync and (self.data_name is not None):
+                self.load_full_ds(chunks=chunks, engine=engine)
+
+            cases = self._find_missing_combos(combos)
+
+            if cases is not None:
+                if not cases:
+                    # nothing to do
+                    return
+
+                if len(cases) < np.prod([len(vals) for _, vals in combos]):
+                    fn_args = tuple(arg for arg, _ in combos)
+                    self.harvest_cases(cases, fn_args=fn_args, sync=sync,
+                                       overwrite=overwrite, chunks=chunks,
+                                       engine=engine, **runner_settings)
+                    return
 
         ds = self.runner.run_combos(combos, **runner_settings)
         self.add_ds(ds, sync=sync, overwrite=overwrite,
@@ -629,9 +1152,130 @@ class Harvester(object):
                   "Sync file -->\n"
                   "    {self.data_name}    [{self.engine}]")
 
+        if self.sharded:
+            string += " (sharded)"
+
         return string.format(self=self)
 
 
+_PART_NM = "part-{:020d}-{}.parquet"
+
+
+def _read_parts(directory, columns=None):
+    """Read every parquet part in ``directory`` as a single dataframe. Since
+    each part is written with the types inferred from its own data, columns
+    are promoted to a common type, e.g. int64 and double to double.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as pads
+
+    dataset = pads.dataset(directory, format='parquet')
+    schemas = [frag.physical_schema for frag in dataset.get_fragments()]
+
+    try:
+        schema = pa.unify_schemas(schemas, promote_options='permissive')
+    except TypeError:  # pragma: no cover
+        # pyarrow < 14 can't promote types, so let pandas do it
+        return pd.concat([
+            frag.to_table(columns=columns).to_pandas()
+            for frag in dataset.get_fragments()
+        ], ignore_index=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        raise ValueError("The parts of the dataframe in {} have incompatible "
+                         "types: {}".format(directory, e))
+
+    dataset = pads.dataset(directory, format='parquet', schema=schema)
+    return dataset.to_table(columns=columns).to_pandas()
+
+
+_SAMPLE_METHODS = {'random', 'sobol', 'lhs'}
+
+
+def _get_rng(seed=None):
+    """Get a random generator from ``seed``. If ``seed`` is None, the
+    generator is itself seeded from the global numpy random state, so that
+    ``np.random.seed`` still makes the sampling reproducible. For numpy <
+    1.17, which lacks ``numpy.random.Generator``, this is a ``RandomState``.
+    """
+    if seed is None:
+        seed = np.random.randint(2**31 - 1)
+
+    if hasattr(np.random, 'default_rng'):
+        return np.random.default_rng(seed)
+
+    if isinstance(seed, np.random.RandomState):
+        return seed
+    return np.random.RandomState(seed)
+
+
+def _accepts_kwarg(fn, name):
+    """Check whether callable ``fn`` can be called with ``name=...``.
+    """
+    try:
+        params = inspect.signature(fn).parameters
+    except (TypeError, ValueError):
+        return False
+    return (name in params) or any(p.kind == p.VAR_KEYWORD
+                                   for p in params.values())
+
+
+def _sample_callable(fn, n, rng):
+    """Draw ``n`` samples from ``fn``, all at once if it takes ``size``, and
+    supplying ``rng`` if it takes that.
+    """
+    kws = {'rng': rng} if _accepts_kwarg(fn, 'rng') else {}
+    if _accepts_kwarg(fn, 'size'):
+        return np.asarray(fn(size=n, **kws))
+    return [fn(**kws) for _ in range(n)]
+
+
+def _default_adaptive_loss(distances, outputs):
+    """Score candidate points by how much the outputs vary between their
+    nearest existing neighbours, times how far away those neighbours are -
+    roughly the gradient of the outputs times the local spacing of points.
+
+    Parameters
+    ----------
+    distances : array, shape (num_candidates, k)
+        The (normalized) distances to each candidate's ``k`` nearest
+        neighbours.
+    outputs : array, shape (num_candidates, k, num_vars)
+        The (normalized) outputs at those neighbours.
+
+    Returns
+    -------
+    array, shape (num_candidates,)
+    """
+    spread = np.nanstd(outputs, axis=1).sum(axis=-1)
+    return spread * distances.mean(axis=1)
+
+
+def _unit_samples(method, n, d, rng):
+    """Generate ``n`` points in the ``d``-dimensional unit hypercube.
+    """
+    if method == 'random':
+        if isinstance(rng, np.random.RandomState):
+            # numpy < 1.17
+            return rng.random_sample((n, d))
+        return rng.random((n, d))
+
+    try:
+        from scipy.stats import qmc
+    except ImportError:
+        raise ImportError("``method='{}'`` requires ``scipy.stats.qmc``, "
+                          "i.e. scipy>=1.7.".format(method))
+
+    if method == 'sobol':
+        sampler = qmc.Sobol(d, seed=rng)
+    else:
+        sampler = qmc.LatinHypercube(d, seed=rng)
+
+    with warnings.catch_warnings():
+        # sobol prefers powers of 2 samples, but any number is fine here
+        warnings.simplefilter('ignore', UserWarning)
+        return sampler.random(n)
+
+
 class Sampler:
     """Like a Harvester, but randomly samples combos and writes the table of
     results to a ``pandas.DataFrame``.
@@ -646,9 +1290,13 @@ class Sampler:
         The default combos to sample from (which can be overridden).
     full_df : pandas.DataFrame, optional
         If given, use this dataframe as the initial 'full' data.
-    engine : {'pickle', 'csv', 'json', 'hdf', ...}, optional
+    engine : {'pickle', 'csv', 'json', 'hdf', 'parquet', ...}, optional
         How to save and load the on-disk dataframe. See
         :func:`~xyzpy.manage.load_df` and :func:`~xyzpy.manage.save_df`.
+        If ``'parquet'``, ``data_name`` is a directory to which each new
+        set of samples is simply appended as a separate part file, rather
+        than re-writing the whole dataframe, and which can be read lazily
+        with only some columns - see :meth:`~xyzpy.Sampler.read_df`.
 
     Attributes
     ----------
@@ -676,12 +1324,43 @@ class Sampler:
     def fn(self, fn):
         self.runner.fn = fn
 
+    def read_df(self, columns=None, engine=None):
+        """Read the on-disk dataframe, without storing it as ``full_df``.
+
+        Parameters
+        ----------
+        columns : sequence of str, optional
+            If given, and using the ``'parquet'`` engine, only read these
+            columns from disk.
+        engine : str, optional
+            Which engine to load the dataframe with, if None use the default.
+
+        Returns
+        -------
+        pandas.DataFrame or None
+        """
+        if engine is None:
+            engine = self.engine
+
+        if not os.path.exists(self.data_name):
+            return None
+
+        if engine == 'parquet':
+            return _read_parts(self.data_name, columns=columns)
+
+        df = load_df(self.data_name, engine=engine)
+        return df if columns is None else df[list(columns)]
+
     def load_full_df(self, engine=None):
         """Load the on-disk full dataframe into memory.
         """
         if engine is None:
             engine = self.engine
 
+        if engine == 'parquet':
+            self._full_df = self.read_df(engine=engine)
+            return
+
         # Check file exists and can be written to
         if os.access(self.data_name, os.W_OK):
             self._full_df = load_df(self.data_name, engine=engine)
@@ -723,22 +1402,43 @@ class Sampler:
         if engine is None:
             engine = self.engine
 
-        if new_full_df is not None:
-            if os.path.exists(self.data_name):
-                os.remove(self.data_name)
-            self._full_df = new_full_df
+        if new_full_df is None:
+            new_full_df = self.full_df
+        self._full_df = new_full_df
+
+        if engine == 'parquet':
+            # replace every part with a single one, all at once
+            with _atomic_path(self.data_name) as tmp_dir:
+                os.makedirs(tmp_dir)
+                self._add_part(self._full_df, tmp_dir)
+            return
 
         save_df(self._full_df, self.data_name, engine=engine)
 
     def delete_df(self, backup=False):
         """Delete the on-disk dataframe, optionally backing it up first.
         """
+        is_dir = os.path.isdir(self.data_name)
+
         if backup:
             import datetime
             ts = '{:%Y%m%d-%H%M%S}'.format(datetime.datetime.now())
-            shutil.copy(self.data_name, self.data_name + '.BAK-{}'.format(ts))
+            copy_fn = shutil.copytree if is_dir else shutil.copy
+            copy_fn(self.data_name, self.data_name + '.BAK-{}'.format(ts))
+
+        if is_dir:
+            shutil.rmtree(self.data_name)
+        else:
+            os.remove(self.data_name)
 
-        os.remove(self.data_name)
+    @staticmethod
+    def _add_part(new_df, directory):
+        """Write ``new_df`` as a new parquet part file in ``directory``.
+        """
+        name = _PART_NM.format(int(time.time() * 10**9),
+                               uuid.uuid4().hex[:8])
+        save_df(new_df, os.path.join(directory, name),
+                engine='parquet', index=False)
 
     def add_df(self, new_df, sync=True, engine=None):
         """Merge a new dataset into the in-memory full dataset.
@@ -756,8 +1456,19 @@ class Sampler:
         if isinstance(new_df, dict):
             new_df = pd.DataFrame(new_df)
 
+        if engine is None:
+            engine = self.engine
+
         # only sync with disk if data name present
         sync_with_disk = sync and (self.data_name is not None)
+
+        if sync_with_disk and engine == 'parquet':
+            # just write the new samples - full_df is read when next needed
+            os.makedirs(self.data_name, exist_ok=True)
+            self._add_part(new_df, self.data_name)
+            self._full_df = None
+            return
+
         if sync_with_disk:
             self.load_full_df(engine=engine)
 
@@ -774,21 +1485,59 @@ class Sampler:
         else:
             self._full_df = new_full_df
 
-    def gen_cases_fnargs(self, n, combos=None):
-        """
+    def gen_cases_fnargs(self, n, combos=None, seed=None, method='random'):
+        """Generate ``n`` random cases, drawing every argument's values all at
+        once.
+
+        Parameters
+        ----------
+        n : int
+            How many cases to generate.
+        combos : dict_like, optional
+            A mapping of function arguments to potential choices, or
+            callables, overriding any in ``default_combos``. A callable is
+            called with ``size=n`` if it takes that argument, else once per
+            case, and with ``rng=`` the random generator if it takes that.
+        seed : None, int or numpy.random.Generator, optional
+            Seed, or generator, for reproducible sampling.
+        method : {'random', 'sobol', 'lhs'}, optional
+            How to choose from the finite sets of values. ``'sobol'`` and
+            ``'lhs'`` (Latin hypercube) use the low-discrepancy designs of
+            :mod:`scipy.stats.qmc` to cover the combinations more evenly.
+
+        Returns
+        -------
+        fn_args : tuple[str]
+        cases : tuple[tuple]
         """
+        if method not in _SAMPLE_METHODS:
+            raise ValueError("``method`` should be one of {}, got {}."
+                             "".format(_SAMPLE_METHODS, method))
+
         combos = {} if combos is None else dict(combos)
         combos = {**self.default_combos, **combos}
-        cases = tuple(
-            tuple(
-                v() if callable(v) else np.random.choice(v)
-                for v in combos.values()
-            ) for _ in range(n)
-        )
+        rng = _get_rng(seed)
+
+        choices = [k for k, v in combos.items() if not callable(v)]
+        if choices:
+            u = _unit_samples(method, n, len(choices), rng)
+
+        columns = {}
+        for j, k in enumerate(choices):
+            values = np.asarray(combos[k])
+            ixs = np.minimum((u[:, j] * len(values)).astype(int),
+                             len(values) - 1)
+            columns[k] = values[ixs]
+
+        for k, v in combos.items():
+            if callable(v):
+                columns[k] = _sample_callable(v, n, rng)
+
+        cases = tuple(zip(*(columns[k] for k in combos)))
         return tuple(combos.keys()), cases
 
-    def sample_combos(self, n, combos=None, engine=None,
-                      **case_runner_settings):
+    def sample_combos(self, n, combos=None, engine=None, seed=None,
+                      method='random', **case_runner_settings):
         """Sample the target function many times, randomly choosing parameter
         combinations from ``combos`` (or ``SampleHarvester.default_combos``).
 
@@ -803,17 +1552,150 @@ class Sampler:
             distribution.
         engine : str, optional
             Which method to use to sync with the on-disk dataframe.
+        seed : None, int or numpy.random.Generator, optional
+            Seed, or generator, for reproducible sampling.
+        method : {'random', 'sobol', 'lhs'}, optional
+            How to sample the combinations, see
+            :meth:`~xyzpy.Sampler.gen_cases_fnargs`.
         case_runner_settings
             Supplied to :func:`~xyzpy.case_runner` and so onto
             :func:`~xyzpy.combo_runner`. This includes ``parallel=True`` etc.
         """
-        fn_args, cases = self.gen_cases_fnargs(n, combos)
+        fn_args, cases = self.gen_cases_fnargs(n, combos, seed=seed,
+                                               method=method)
         last_df = self.runner.run_cases(cases, fn_args=fn_args,
                                         to_df=True, **case_runner_settings)
         self._last_df = last_df
         self.add_df(last_df, engine=engine)
         return last_df
 
+    def sample_adaptive(self, n, combos=None, loss=None, var_names=None,
+                        batchsize=None, k=None, num_candidates=None,
+                        seed=None, engine=None, **case_runner_settings):
+        """Sample the target function ``n`` times, but rather than uniformly,
+        iteratively choose new points where the outputs vary most amongst
+        the existing samples in ``full_df``. Each batch of new points is run
+        together, e.g. in parallel, using :func:`~xyzpy.case_runner`.
+
+        Parameters
+        ----------
+        n : int
+            How many samples to run in total.
+        combos : dict_like, optional
+            A mapping of function arguments to potential choices, overriding
+            any in ``default_combos``. Candidate points are drawn from these,
+            so they should all be numeric.
+        loss : callable, optional
+            Called as ``loss(distances, outputs)`` for the normalized
+            distances to, and outputs at, the ``k`` nearest existing samples
+            of each candidate, returning a score for each candidate - the
+            highest scoring are run next. See
+            :func:`~xyzpy.gen.farming._default_adaptive_loss`.
+        var_names : sequence of str, optional
+            Which outputs to consider, by default all of the runner's.
+        batchsize : int, optional
+            How many points to run at once, by default ``n // 10``.
+        k : int, optional
+            How many nearest neighbours to consider, by default twice the
+            number of arguments plus one.
+        num_candidates : int, optional
+            How many candidate points to score for each batch, by default
+            ``20 * batchsize``.
+        seed : None, int or numpy.random.Generator, optional
+            Seed, or generator, for reproducible sampling.
+        engine : str, optional
+            Which method to use to sync with the on-disk dataframe.
+        case_runner_settings
+            Supplied to :func:`~xyzpy.case_runner` and so onto
+            :func:`~xyzpy.combo_runner`. This includes ``parallel=True`` etc.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The samples run.
+        """
+        from scipy.spatial import cKDTree
+
+        if loss is None:
+            loss = _default_adaptive_loss
+        if var_names is None:
+            var_names = self.runner.var_names
+        var_names = list(var_names)
+
+        combos = {} if combos is None else dict(combos)
+        fn_args = tuple({**self.default_combos, **combos})
+        if k is None:
+            k = 2 * len(fn_args) + 1
+        if batchsize is None:
+            batchsize = max(1, n // 10)
+        if num_candidates is None:
+            num_candidates = 20 * batchsize
+        rng = _get_rng(seed)
+
+        def run(cases):
+            df = self.runner.run_cases(cases, fn_args=fn_args, to_df=True,
+                                       **case_runner_settings)
+            self.add_df(df, engine=engine)
+            return df
+
+        def current_df():
+            if self.data_name is None:
+                return self._full_df
+            return self.full_df
+
+        dfs = []
+        num_run = 0
+
+        # need at least a few points to start with
+        num_existing = 0 if current_df() is None else len(current_df())
+        if num_existing <= k:
+            num_init = min(n, k + 1 - num_existing)
+            _, cases = self.gen_cases_fnargs(num_init, combos, seed=rng)
+            dfs.append(run(cases))
+            num_run += num_init
+
+        while num_run < n:
+            full_df = current_df()
+            x = full_df[list(fn_args)].to_numpy(dtype=float)
+            y = full_df[var_names].to_numpy(dtype=float)
+
+            # normalize inputs and outputs so that all count equally
+            x_shift, x_scale = x.min(axis=0), np.ptp(x, axis=0)
+            x_scale[x_scale == 0.0] = 1.0
+            y_scale = np.nanstd(y, axis=0)
+            y_scale[~(y_scale > 0.0)] = 1.0
+
+            _, candidates = self.gen_cases_fnargs(num_candidates, combos,
+                                                  seed=rng)
+            cx = (np.array(candidates, dtype=float) - x_shift) / x_scale
+
+            tree = cKDTree((x - x_shift) / x_scale)
+            distances, ixs = tree.query(cx, k=min(k, len(x)))
+            distances = distances.reshape(len(cx), -1)
+            ixs = ixs.reshape(len(cx), -1)
+            scores = loss(distances, y[ixs] / y_scale)
+
+            # don't re-run existing points, or the same candidate twice
+            scores = np.where(distances[:, 0] > 0.0, scores, -np.inf)
+            _, first = np.unique(cx, axis=0, return_index=True)
+            unique = np.zeros(len(cx), dtype=bool)
+            unique[first] = True
+            scores = np.where(unique, scores, -np.inf)
+
+            num_batch = min(batchsize, n - num_run)
+            best = np.argsort(-scores, kind='stable')[:num_batch]
+            best = best[np.isfinite(scores[best])]
+            if len(best) == 0:
+                # every candidate already sampled
+                break
+
+            dfs.append(run([candidates[i] for i in best]))
+            num_run += len(best)
+
+        if dfs:
+            self._last_df = pd.concat(dfs, ignore_index=True, sort=True)
+        return self._last_df
+
     def Crop(self,
              name=None,
              parent_dir=None,
@@ -0,0 +1,106 @@
+"""Share large numpy arrays with worker processes via memory-mapped files,
+rather than pickling them along with every single task.
+"""
+import contextlib
+import os
+import tempfile
+import uuid
+import weakref
+
+import numpy as np
+
+
+# only arrays at least this large are worth writing to disk
+_SHARE_MIN_NBYTES = 2**20
+
+# arrays currently attached to in this process, by path - weakly referenced
+# so that reused workers unmap the files once tasks no longer need them
+_ATTACHED = weakref.WeakValueDictionary()
+
+
+def _shared_dir():
+    """Directory to store shared arrays in, in memory if possible.
+    """
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+class SharedArray(np.memmap):
+    """A read-only memory-mapped array that pickles as just the path of its
+    file, so that unpickling it in another process re-attaches to the same
+    memory rather than copying it. Any views of it pickle normally.
+    """
+
+    _xyz_shared_path = None
+
+    def __array_finalize__(self, obj):
+        super().__array_finalize__(obj)
+        self._xyz_shared_path = None
+
+    def __reduce__(self):
+        if self._xyz_shared_path is None:
+            return np.asarray(self).__reduce__()
+        return (attach_shared_array, (self._xyz_shared_path,))
+
+    def __reduce_ex__(self, protocol):
+        return self.__reduce__()
+
+
+def attach_shared_array(path):
+    """Load the shared array stored at ``path``, only memory-mapping each file
+    once per process while it is in use.
+    """
+    x = _ATTACHED.get(path)
+    if x is None:
+        x = np.load(path, mmap_mode='r').view(SharedArray)
+        x._xyz_shared_path = path
+        _ATTACHED[path] = x
+    return x
+
+
+def _should_share(x, min_nbytes):
+    return (isinstance(x, np.ndarray) and
+            not isinstance(x, SharedArray) and
+            not x.dtype.hasobject and
+            x.nbytes >= min_nbytes)
+
+
+@contextlib.contextmanager
+def shared_arrays(kwargs, min_nbytes=_SHARE_MIN_NBYTES):
+    """Context manager that writes every large numpy array in ``kwargs`` to a
+    memory-mapped file (in ``/dev/shm`` if available), yielding new kwargs in
+    which they are replaced by :class:`SharedArray` instances. The files are
+    removed upon exit.
+
+    Parameters
+    ----------
+    kwargs : dict
+        Keyword arguments, e.g. the constants and resources of a run.
+    min_nbytes : int, optional
+        Only arrays with at least this many bytes are shared.
+
+    Yields
+    ------
+    dict
+    """
+    paths = []
+    try:
+        new_kwargs = {}
+        for k, v in kwargs.items():
+            if _should_share(v, min_nbytes):
+                path = os.path.join(_shared_dir(),
+                                    'xyz-shared-{}.npy'.format(uuid.uuid4()))
+                paths.append(path)
+                np.save(path, v)
+                v = attach_shared_array(path)
+            new_kwargs[k] = v
+        yield new_kwargs
+    finally:
+        for path in paths:
+            _ATTACHED.pop(path, None)
+            try:
+                os.remove(path)
+            except (FileNotFoundError, PermissionError):
+                # already gone, or still mapped elsewhere (e.g. on windows)
+                pass
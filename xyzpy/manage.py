@@ -3,6 +3,9 @@
 # TODO: add singlet dimensions (for all or given vars) ---------------------- #
 
 import os
+import uuid
+import shutil
+import contextlib
 from glob import glob
 
 import numpy as np
@@ -47,6 +50,62 @@ def auto_add_extension(file_name, engine):
     return file_name
 
 
+def _fsync(path):
+    """Flush ``path`` - a file, or every file in a directory - to disk.
+    """
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for f in files:
+                _fsync(os.path.join(root, f))
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def _atomic_path(file_name, fsync=True):
+    """Yield a temporary path, in the same directory as ``file_name``, to
+    write to. If that succeeds, the temporary file (or directory) is flushed
+    to disk (if ``fsync``) and moved into place, so that ``file_name`` is
+    never seen partly written, even after a crash. Else it is removed.
+    """
+    directory, base = os.path.split(file_name)
+    # keep the original name as a suffix so that extensions are preserved
+    tmp_name = os.path.join(
+        directory, '.xyz-tmp-{}-{}'.format(uuid.uuid4().hex[:8], base))
+
+    def remove(path):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    try:
+        yield tmp_name
+        if fsync:
+            _fsync(tmp_name)
+
+        if os.path.isdir(tmp_name) and os.path.isdir(file_name):
+            # can't atomically replace a non-empty directory
+            old_name = tmp_name + '.old'
+            os.replace(file_name, old_name)
+            os.replace(tmp_name, file_name)
+            shutil.rmtree(old_name)
+        else:
+            os.replace(tmp_name, file_name)
+    except BaseException:
+        remove(tmp_name)
+        raise
+
+    if fsync:
+        # make sure the rename itself is durable
+        with contextlib.suppress(OSError):
+            _fsync(directory or '.')
+
+
 def save_ds(ds, file_name, engine="h5netcdf", **kwargs):
     """Saves a xarray dataset.
 
@@ -59,6 +118,11 @@ def save_ds(ds, file_name, engine="h5netcdf", **kwargs):
     engine : {'h5netcdf', 'netcdf4', 'joblib', 'zarr'}, optional
         Engine used to save file with.
 
+    The dataset is written to a temporary file first which is then moved into
+    place, so that an existing file is never lost due to a failed write.
+    Appending to a zarr store (``mode='a'`` or ``append_dim``) happens in
+    place however.
+
     Returns
     -------
         None
@@ -75,12 +139,19 @@ def save_ds(ds, file_name, engine="h5netcdf", **kwargs):
             if val is False:
                 ds.attrs[attr] = "False"
 
-    if engine == 'joblib':
-        joblib.dump(ds, file_name, **kwargs)
-    elif engine == 'zarr':
+    if engine == 'zarr' and (kwargs.get('mode') in ('a', 'r+') or
+                             'append_dim' in kwargs or
+                             'region' in kwargs):
         ds.to_zarr(file_name, **kwargs)
-    else:
-        ds.to_netcdf(file_name, engine=engine, **kwargs)
+        return
+
+    with _atomic_path(file_name) as tmp_name:
+        if engine == 'joblib':
+            joblib.dump(ds, tmp_name, **kwargs)
+        elif engine == 'zarr':
+            ds.to_zarr(tmp_name, **kwargs)
+        else:
+            ds.to_netcdf(tmp_name, engine=engine, **kwargs)
 
 
 def load_ds(file_name,
@@ -339,14 +410,21 @@ def merge_sync_conflict_datasets(base_name, engine='h5netcdf',
 
 
 def save_df(df, name, engine='pickle', key='df', **kwargs):
-    """Save a dataframe to disk.
+    """Save a dataframe to disk. Apart from with ``engine='hdf'``, which can
+    store many dataframes in the same file, this goes via a temporary file
+    that is moved into place only once completely written.
     """
     meth = "to_{}".format(engine)
     if engine == 'hdf':
         kwargs['key'] = key
+        getattr(df, meth)(name, **kwargs)
+        return
+
     if engine == 'csv':
         kwargs.setdefault('index', False)
-    getattr(df, meth)(name, **kwargs)
+
+    with _atomic_path(name) as tmp_name:
+        getattr(df, meth)(tmp_name, **kwargs)
 
 
 def load_df(name, engine='pickle', key='df', **kwargs):
@@ -356,4 +434,4 @@ def load_df(name, engine='pickle', key='df', **kwargs):
     func = "read_{}".format(engine)
     if engine == 'hdf':
         kwargs['key'] = key
-    return getattr(pd, func)(name)
+    return getattr(pd, func)(name, **kwargs)